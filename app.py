@@ -2,7 +2,6 @@ import streamlit as st
 import pandas as pd
 import pydeck as pdk
 import plotly.express as px
-import json
 from supabase import create_client
 import os
 import time
@@ -11,6 +10,10 @@ import threading
 import asyncio
 import data_engine
 import telegram_engine
+import signal_feed
+import local_db
+import event_bus
+import map_bins
 
 st.set_page_config(page_title="VIta Alpha", layout="wide", page_icon="❎")
 
@@ -64,7 +67,12 @@ def get_secret(key):
     except: pass
     return None
 
-if os.environ.get("ENABLE_WORKERS", "False").lower() == "true":
+WORKERS_ENABLED = os.environ.get("ENABLE_WORKERS", "False").lower() == "true"
+DASHBOARD_POLL = float(os.environ.get("DASHBOARD_POLL", 2))
+# only used when nothing pushes changes onto the bus
+DASHBOARD_FALLBACK_POLL = float(os.environ.get("DASHBOARD_FALLBACK_POLL", 30))
+
+if WORKERS_ENABLED:
     start_background_workers()
 
 supabase = None
@@ -73,41 +81,68 @@ try:
     key = get_secret("SUPABASE_KEY")
     if url and key:
         supabase = create_client(url, key)
+    elif get_secret("LOCAL_DB_PATH"):
+        supabase = local_db.LocalClient(get_secret("LOCAL_DB_PATH"))
 except Exception as e:
     st.error(f"Database Connection Failed: {e}")
 
-def parse_vectors(row):
-    try:
-        data = json.loads(row['vectors'])
-        return pd.Series([
-            float(data.get('lat', 6.927)), 
-            float(data.get('lon', 79.861)), 
-            str(data.get('logistics_impact', 'CLEAR')), 
-            str(data.get('sentiment_type', 'RISK'))
-        ])
-    except:
-        return pd.Series([6.927, 79.861, "CLEAR", "RISK"])
+@st.cache_resource
+def start_change_notifications():
+    # in-process workers publish straight onto event_bus.BUS; otherwise relay
+    # the database's realtime INSERTs onto it
+    url, key = get_secret("SUPABASE_URL"), get_secret("SUPABASE_KEY")
+    if not WORKERS_ENABLED and url and key:
+        event_bus.start_realtime_bridge(url, key)
+        return True
+    return WORKERS_ENABLED
+
+@st.cache_resource
+def get_signal_feed():
+    return signal_feed.SignalFeed(supabase)
+
+@st.cache_resource
+def get_bucket_series():
+    return signal_feed.BucketSeries(supabase)
+
+@st.cache_resource
+def get_hex_bins():
+    return map_bins.HexBins(supabase)
+
+MAP_WINDOWS = {"Latest 15": None, "24h": timedelta(days=1), "7d": timedelta(days=7), "30d": timedelta(days=30)}
 
 st.title("VIta Alpha ❎")
 
-@st.fragment(run_every=2)
+PUSH_CHANGES = start_change_notifications()
+
+def dashboard_version():
+    # with a push source the in-memory bus version is all a tick reads; without
+    # one the shared feed's incremental refresh is the only way to see new rows
+    if PUSH_CHANGES: return event_bus.BUS.version
+    if supabase: get_signal_feed().frame()
+    return get_signal_feed().version
+
+@st.fragment(run_every=DASHBOARD_POLL if PUSH_CHANGES else DASHBOARD_FALLBACK_POLL)
+def watch_changes():
+    # renders nothing: it only compares versions, and reruns the page when
+    # there is something new to draw
+    if dashboard_version() != st.session_state.get("dashboard_version"):
+        st.rerun()
+
 def live_dashboard():
+    st.session_state.dashboard_version = dashboard_version()
+    render_dashboard()
+    watch_changes()
+
+def render_dashboard():
     df = pd.DataFrame()
     if supabase:
-        try:
-            res = supabase.table('signals').select("*").order('timestamp', desc=True).execute()
-            df = pd.DataFrame(res.data)
-        except: 
-            pass 
+        df = get_signal_feed().frame()
     
     if df.empty:
         st.warning("Waiting for uplink... (Check Database Connection)")
         return
 
-    df[['lat', 'lon', 'logistics', 'sentiment']] = df.apply(parse_vectors, axis=1)
-    df['timestamp'] = pd.to_datetime(df['timestamp']).dt.tz_convert('Asia/Colombo').dt.tz_localize(None)
-    
-    display_df = df.sort_values('timestamp', ascending=False)
+    display_df = df.iloc[::-1]
     latest = display_df.iloc[0]
 
     c1, c2, c3, c4 = st.columns([2, 1, 1, 1])
@@ -139,12 +174,13 @@ def live_dashboard():
 
     st.divider()
 
-    df['Trend Value'] = df.apply(lambda x: x['risk_score'] if x['sentiment'] == 'OPPORTUNITY' else x['risk_score'] * -1, axis=1)
-    chart_df = df.sort_values('timestamp')
+    buckets = get_bucket_series().frame()
+    if buckets.empty: buckets = signal_feed.buckets_from_frame(df)
+    chart_df = buckets.melt(id_vars='timestamp', value_vars=['Opportunity', 'Risk'], var_name='Signal', value_name='Trend Value')
     
-    fig = px.area(chart_df, x='timestamp', y='Trend Value', 
+    fig = px.area(chart_df, x='timestamp', y='Trend Value', color='Signal',
                   title="Real-Time Sentiment Volatility",
-                  color_discrete_sequence=['#00ff9d'])
+                  color_discrete_map={'Opportunity': '#00ff9d', 'Risk': '#ff4b4b'})
     
     fig.update_layout(
         plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
@@ -172,25 +208,32 @@ def live_dashboard():
     st.divider()
 
   
-    map_df = display_df.head(15).copy()
+    window = st.radio("Map window", list(MAP_WINDOWS), horizontal=True)
+    bins = get_hex_bins().frame(MAP_WINDOWS[window]) if MAP_WINDOWS[window] else pd.DataFrame()
 
-    map_df['color'] = map_df.apply(lambda x: [0, 255, 255, 200] if x['sentiment'] == 'OPPORTUNITY' else 
-                                     ([255, 0, 0, 180] if x['risk_score'] > 75 else 
-                                      [255, 165, 0, 180] if x['risk_score'] > 40 else 
-                                      [0, 255, 100, 180]), axis=1)
-    
-    layer = pdk.Layer(
-        "ScatterplotLayer", map_df,
-        get_position='[lon, lat]', get_color="color", get_radius=8000,
-        pickable=True, stroked=True, filled=True,
-        radius_min_pixels=5, radius_max_pixels=50,
-    )
+    if not bins.empty:
+        layer = pdk.Layer(
+            "ColumnLayer", bins,
+            get_position='[lon, lat]', get_fill_color="[r, g, b, a]", get_elevation="weight",
+            radius=get_hex_bins().size_km * 1000, disk_resolution=6, elevation_scale=50,
+            extruded=True, pickable=True,
+        )
+        tooltip = "<b>{count} signals</b><br/>⚠️ Risk: {risk_weight} (max {risk_max})<br/>📈 Opportunity: {opp_weight}"
+    else:
+        map_df = display_df.head(15)[['lon', 'lat', 'r', 'g', 'b', 'a', 'headline', 'risk_score', 'reason']]
+        layer = pdk.Layer(
+            "ScatterplotLayer", map_df,
+            get_position='[lon, lat]', get_color="[r, g, b, a]", get_radius=8000,
+            pickable=True, stroked=True, filled=True,
+            radius_min_pixels=5, radius_max_pixels=50,
+        )
+        tooltip = "<b>{headline}</b><br/>⚠️ Score: {risk_score}<br/>ℹ️ Reason: {reason}"
     
     st.pydeck_chart(pdk.Deck(
         layers=[layer],
-        initial_view_state=pdk.ViewState(latitude=7.87, longitude=80.77, zoom=7.5),
+        initial_view_state=pdk.ViewState(latitude=7.87, longitude=80.77, zoom=7.5, pitch=40 if not bins.empty else 0),
         tooltip={
-            "html": "<b>{headline}</b><br/>⚠️ Score: {risk_score}<br/>ℹ️ Reason: {reason}",
+            "html": tooltip,
             "style": {"color": "white", "backgroundColor": "#1E1E1E"}
         }
     ))
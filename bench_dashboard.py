@@ -0,0 +1,64 @@
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+import signal_feed
+
+def synthetic_signals(n, seed=3):
+    rng = random.Random(seed)
+    start = datetime.now(timezone.utc) - timedelta(days=7)
+    rows = []
+    for i in range(n):
+        vectors = {"lat": rng.uniform(5.9, 9.8), "lon": rng.uniform(79.6, 81.9),
+                   "logistics_impact": rng.choice(["CLEAR", "POTENTIAL DELAY", "BLOCKED"]),
+                   "sentiment_type": rng.choice(["RISK", "RISK", "OPPORTUNITY"])}
+        if i % 500 == 0: vectors = "not json"
+        rows.append({
+            "timestamp": (start + timedelta(seconds=6 * i)).isoformat(),
+            "source": "Synthetic", "headline": f"Signal {i}", "link": f"https://example.lk/{i}",
+            "risk_score": rng.randint(15, 100), "priority": "HIGH", "reason": "bench",
+            "vectors": vectors if isinstance(vectors, str) else json.dumps(vectors),
+        })
+    return pd.DataFrame(rows)
+
+def legacy_prepare(df):
+    def parse_vectors(row):
+        try:
+            data = json.loads(row['vectors'])
+            return pd.Series([
+                float(data.get('lat', 6.927)), 
+                float(data.get('lon', 79.861)), 
+                str(data.get('logistics_impact', 'CLEAR')), 
+                str(data.get('sentiment_type', 'RISK'))
+            ])
+        except:
+            return pd.Series([6.927, 79.861, "CLEAR", "RISK"])
+
+    df = df.copy()
+    df[['lat', 'lon', 'logistics', 'sentiment']] = df.apply(parse_vectors, axis=1)
+    df['timestamp'] = pd.to_datetime(df['timestamp']).dt.tz_convert('Asia/Colombo').dt.tz_localize(None)
+    df['Trend Value'] = df.apply(lambda x: x['risk_score'] if x['sentiment'] == 'OPPORTUNITY' else x['risk_score'] * -1, axis=1)
+    df['color'] = df.apply(lambda x: [0, 255, 255, 200] if x['sentiment'] == 'OPPORTUNITY' else 
+                           ([255, 0, 0, 180] if x['risk_score'] > 75 else 
+                            [255, 165, 0, 180] if x['risk_score'] > 40 else 
+                            [0, 255, 100, 180]), axis=1)
+    return df
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - start, out
+
+if __name__ == "__main__":
+    n = 100000
+    df = synthetic_signals(n)
+    t_new, fast = timed(lambda: signal_feed.prepare_signals(df))
+    t_old, slow = timed(lambda: legacy_prepare(df))
+    assert (fast['Trend Value'].to_numpy() == slow['Trend Value'].to_numpy()).all()
+    assert (fast['sentiment'] == slow['sentiment']).all()
+    t_inc, _ = timed(lambda: signal_feed.prepare_signals(df.tail(50)))
+    print(f"{n} signals")
+    print(f"legacy row-wise apply:      {t_old:8.3f} s")
+    print(f"vectorised prepare_signals: {t_new:8.3f} s  (x{t_old / t_new:.0f})")
+    print(f"incremental refresh (50 new rows): {t_inc * 1e3:.2f} ms")
@@ -0,0 +1,42 @@
+import random
+import timeit
+import keywords
+
+HEADLINES = [
+    "Heavy traffic on Galle Road after bus crash near Wellawatte",
+    "Colombo Port terminal operations resume after customs strike",
+    "CEB warns of island-wide blackout as Norochcholai breakdown continues",
+    "Sri Lanka won by 5 wickets in the second ODI against India",
+    "Central Bank holds rates as rupee strengthens against the dollar",
+    "Two killed and five injured in landslide in Badulla",
+    "Japan announces grant for Southern Expressway interchange upgrade",
+    "Cabinet spokesman comments on upcoming party convention",
+    "Water supply to be cut in parts of Kotte for 12 hours",
+    "Flights delayed at BIA due to bad weather",
+]
+
+def legacy_scan(text):
+    text_lower = text.lower()
+    hits = set()
+    if any(k in text_lower for k in keywords.SPORTS_BAN_LIST): hits.add("SPORTS")
+    for sector, words in keywords.CRITICAL_INFRASTRUCTURE.items():
+        if any(k in text.lower() for k in words): hits.add(sector)
+    if any(k in text_lower for k in keywords.LOW_SCORE_KEYWORDS): hits.add("LOW_SCORE_RELEVANT")
+    for name, words in keywords.SYMBOLIC_KEYWORDS.items():
+        if any(k in text_lower for k in words): hits.add(name)
+    return hits
+
+if __name__ == "__main__":
+    random.seed(7)
+    corpus = [random.choice(HEADLINES) + " " + random.choice(HEADLINES) for _ in range(2000)]
+    matcher = keywords.build_matcher()
+
+    build = timeit.timeit(keywords.build_matcher, number=10) / 10
+    legacy = min(timeit.repeat(lambda: [legacy_scan(t) for t in corpus], number=5, repeat=3)) / 5
+    compiled = min(timeit.repeat(lambda: [matcher.match(t) for t in corpus], number=5, repeat=3)) / 5
+
+    print(f"build matcher:      {build * 1e3:8.2f} ms")
+    print(f"legacy any() scans: {legacy / len(corpus) * 1e6:8.2f} us/text")
+    print(f"compiled matcher:   {compiled / len(corpus) * 1e6:8.2f} us/text")
+    for text in HEADLINES:
+        print(f"  {sorted(matcher.match(text))!s:55} {text}")
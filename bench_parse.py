@@ -0,0 +1,78 @@
+import glob
+import os
+import sys
+import time
+import urllib.request
+import html_extract
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+
+SOURCES = {
+    "ada_derana": "http://www.adaderana.lk/hot-news/",
+    "newswire": "https://www.newswire.lk/",
+}
+
+def record():
+    # saves the current front pages as fixtures: python bench_parse.py --record
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, url in SOURCES.items():
+        req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+        with urllib.request.urlopen(req, timeout=15) as resp:
+            body = resp.read().decode("utf-8", errors="replace")
+        with open(os.path.join(FIXTURE_DIR, f"{name}.html"), "w", encoding="utf-8") as f:
+            f.write(body)
+        print(f"recorded {name}: {len(body) / 1024:.0f} KiB")
+
+def load_fixtures():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding="utf-8") as f:
+            pages[name] = (SOURCES.get(name, "http://localhost/"), f.read())
+    return pages
+
+def legacy_extract(html_content, url):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_content, 'html.parser')
+    root = html_extract.base_url(url)
+    found, seen = [], set()
+    for selector in html_extract.DEFAULT_SELECTORS:
+        for item in soup.select(selector, limit=10):
+            title = item.get_text(strip=True)
+            href = item.get('href')
+            if not title or not href: continue
+            if href.startswith('/'): href = root + href
+            if href not in seen:
+                seen.add(href)
+                found.append((title, href))
+    return found
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    if "--record" in sys.argv:
+        record()
+        sys.exit(0)
+
+    pages = load_fixtures()
+    if not pages:
+        print(f"no fixtures in {FIXTURE_DIR}; run with --record first")
+        sys.exit(1)
+
+    profile = html_extract.compile_profile("default")
+    for name, (url, body) in pages.items():
+        fast = timed(lambda: html_extract.extract_links(body, url, profile), 20)
+        links = len(html_extract.extract_links(body, url, profile))
+        line = f"{name:14} {len(body) / 1024:7.0f} KiB  lxml+xpath {fast * 1e3:7.2f} ms ({links} links)"
+        try:
+            slow = timed(lambda: legacy_extract(body, url), 5)
+            line += f"  bs4 html.parser {slow * 1e3:7.2f} ms  x{slow / fast:.1f}"
+        except ImportError:
+            pass
+        print(line)
@@ -0,0 +1,374 @@
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import numpy as np
+
+# Offline replay of the ingestion path: recorded HTML fixtures are served from
+# a local HTTP server and fetched with the real fetch_html, a Telegram corpus
+# goes through the real coalescer, and everything runs through the real
+# dedupe -> score -> write pipeline. Groq is replaced by a deterministic stub
+# with configurable latency and error rate, Supabase by local_db.LocalClient.
+#
+#   python bench_pipeline.py --out bench_pipeline.json
+#   python bench_pipeline.py --llm-latency 0.8 --llm-error-rate 0.05 --compare bench_pipeline.json
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+EMBEDDING_DIM = 384
+
+def isolate_environment(workdir):
+    # must run before data_engine is imported: it reads these at import time.
+    # Empty Supabase credentials make get_secret() ignore any secrets.toml.
+    os.environ.update({
+        "SUPABASE_URL": "", "SUPABASE_KEY": "",
+        "LOCAL_DB_PATH": os.path.join(workdir, "bench.sqlite"),
+        "SPOOL_PATH": os.path.join(workdir, "spool.sqlite"),
+        "EMBEDDING_CACHE_DIR": os.path.join(workdir, "embeddings"),
+        "SEEN_LINKS_PATH": "", "VERDICT_CACHE_PATH": "",
+        "PRECLASSIFIER_PATH": os.path.join(workdir, "preclassifier.npz"),
+        "GROQ_API_KEY": "bench-stub",
+    })
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+class HashingEmbedder:
+    # deterministic stand-in for MiniLM when the model is not available
+    # offline: normalised bag of hashed word tokens
+    def encode(self, texts, **kwargs):
+        out = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for tok in re.findall(r"\w+", text.lower()):
+                out[i, int(hashlib.md5(tok.encode()).hexdigest()[:8], 16) % EMBEDDING_DIM] += 1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+class StubGroq:
+    # Drop-in for GroqPool.complete(). Verdicts are a pure function of the item
+    # text, and whether a call fails depends only on its content and how often
+    # that content has been sent, so runs are reproducible regardless of
+    # scheduling.
+    def __init__(self, latency=0.3, per_item=0.02, error_rate=0.0, max_concurrency=4, reject_share=0.4):
+        self.latency = latency
+        self.per_item = per_item
+        self.error_rate = error_rate
+        self.reject_share = reject_share
+        self.max_concurrency = max_concurrency
+        self.calls = 0
+        self.errors = 0
+        self.items = 0
+        self._attempts = {}
+        self._semaphores = {}
+
+    @staticmethod
+    def _fraction(*parts):
+        return int(hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+    def verdict(self, text):
+        if self._fraction("valid", text) < self.reject_share: return {"validity": False}
+        return {
+            "validity": True, "score": int(self._fraction("score", text) * 100),
+            "reason": "stub verdict", "location_name": "",
+            "logistics_status": "POTENTIAL DELAY" if self._fraction("logistics", text) < 0.2 else "CLEAR",
+            "sentiment_type": "OPPORTUNITY" if self._fraction("sentiment", text) < 0.15 else "RISK",
+            "lat": 0.0, "lon": 0.0,
+        }
+
+    async def complete(self, est_tokens=1000, **kwargs):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.setdefault(loop, asyncio.Semaphore(self.max_concurrency))
+        content = kwargs["messages"][-1]["content"]
+        async with semaphore:
+            self.calls += 1
+            attempt = self._attempts[content] = self._attempts.get(content, 0) + 1
+            if "ITEMS:\n" in content:
+                parts = re.split(r"(?m)^\[(\d+)\] ", content.split("ITEMS:\n", 1)[1])
+                items = [(int(parts[i]), parts[i + 1].strip()) for i in range(1, len(parts) - 1, 2)]
+            else:
+                items = [(None, content.split("TEXT: ", 1)[-1])]
+            self.items += len(items)
+            await asyncio.sleep(self.latency + self.per_item * len(items))
+            if self._fraction("error", content, attempt) < self.error_rate:
+                self.errors += 1
+                raise RuntimeError("stub Groq error")
+
+        if items[0][0] is None:
+            body = self.verdict(items[0][1])
+        else:
+            body = {"results": [dict(self.verdict(text), id=i) for i, text in items]}
+        message = SimpleNamespace(content=json.dumps(body))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+EVENTS = ["Flooding reported", "Landslide warning issued", "Power outage hits", "Fuel queues return to",
+          "Road blocked by fallen trees near", "Train services delayed at", "Protest outside the port in",
+          "New investment announced for", "Water supply cut in", "Fire breaks out at market in",
+          "Cricket fans gather in", "Heavy traffic reported around", "Hospital appeals for blood donors in",
+          "Prices of vegetables rise in", "Relief aid reaches families in"]
+DETAILS = ["this morning", "after heavy rain", "according to police", "residents say",
+           "officials confirmed", "DMC update", "more to follow", "situation under control",
+           "hundreds affected", "authorities on alert"]
+PLACES = ["Colombo", "Kandy", "Galle", "Jaffna", "Ratnapura", "Kegalle", "Badulla", "Matara", "Negombo",
+          "Batticaloa", "Trincomalee", "Kurunegala", "Anuradhapura", "Nuwara Eliya", "Hambantota"]
+
+def synthetic_telegram(n, seed=7):
+    # reposts of the same event across channels are what make crisis traffic
+    # expensive, so about a third of the messages re-use an earlier event
+    rng = random.Random(seed)
+    channels = [f"channel_{i}" for i in range(12)]
+    events = []
+    corpus = []
+    for i in range(n):
+        if events and rng.random() < 0.35:
+            base = rng.choice(events)
+        else:
+            base = f"{rng.choice(EVENTS)} {rng.choice(PLACES)}"
+            events.append(base)
+        text = f"{base} - {rng.choice(DETAILS)} ({i})"
+        corpus.append({"chat": rng.choice(channels), "id": i, "text": text})
+    return corpus
+
+def load_telegram_corpus(n):
+    # recorded corpora: fixtures/telegram/*.jsonl with {"chat", "id", "text"} per line
+    rows = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "telegram", "*.jsonl"))):
+        with open(path, encoding="utf-8") as f:
+            rows.extend(json.loads(line) for line in f if line.strip())
+    return (rows or synthetic_telegram(n))[:n]
+
+def load_html_fixtures():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "html", "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return pages
+
+def percentiles(values):
+    if not len(values): return {"p50": None, "p95": None, "p99": None, "count": 0}
+    p50, p95, p99 = (float(p) for p in np.percentile(np.asarray(values, dtype=float) * 1e3, [50, 95, 99]))
+    return {"p50": round(p50, 3), "p95": round(p95, 3), "p99": round(p99, 3), "count": len(values)}
+
+def peak_rss_mb():
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        return None
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+async def serve_fixtures(pages):
+    from aiohttp import web
+    async def handler(request):
+        body = pages.get(request.match_info["name"])
+        if body is None: return web.Response(status=404)
+        return web.Response(text=body, content_type="text/html")
+    app = web.Application()
+    app.router.add_get("/{name}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1]
+
+async def bench_fetch(data_engine, session, port, pages, rounds):
+    latencies, items = [], []
+    started = time.perf_counter()
+    for r in range(rounds):
+        for name in pages:
+            # forget ETag/digest state, so every round is a full fetch + parse
+            data_engine.PAGE_STATE.clear()
+            target = {"name": name, "url": f"http://127.0.0.1:{port}/{name}", "profile": data_engine.DEFAULT_PROFILE}
+            t = time.perf_counter()
+            batch = await data_engine.fetch_html(session, target)
+            latencies.append(time.perf_counter() - t)
+            if r == 0: items.extend(batch or [])
+    elapsed = time.perf_counter() - started
+    return items, {"pages": len(latencies), "links": len(items), "seconds": round(elapsed, 4),
+                   "pages_per_sec": round(len(latencies) / elapsed, 2), "latency_ms": percentiles(latencies)}
+
+async def bench_pipeline(data_engine, telegram_engine, html_items, corpus, coalesce_window):
+    writer = data_engine.SIGNAL_WRITER
+    written_before = writer.written
+    pipe = data_engine.get_pipeline()
+    coalescer = telegram_engine.SignalCoalescer(data_engine.submit, window=coalesce_window)
+
+    started = time.perf_counter()
+    await data_engine.submit(html_items)
+    for msg in corpus:
+        text = msg["text"]
+        await coalescer.add({
+            "title": text[:100] + "...", "full_text": text,
+            "link": f"https://t.me/{msg['chat']}/{msg['id']}", "source": f"Telegram ({msg['chat']})",
+            "published": datetime.now(timezone.utc).isoformat(),
+        })
+    await coalescer.flush()
+    await pipe.drain()
+    await asyncio.to_thread(writer.flush)
+    elapsed = time.perf_counter() - started
+
+    total = len(html_items) + len(corpus)
+    stages = {}
+    for stage in pipe.stages:
+        stages[stage.name] = {"processed": stage.processed, "errors": stage.errors,
+                              "batches": len(stage.latencies), "batch_latency_ms": percentiles(list(stage.latencies))}
+    await data_engine.shutdown_pipeline()
+    return {"items": total, "signals_written": writer.written - written_before, "spooled": writer.spooled,
+            "stories": len(data_engine.STORIES), "seconds": round(elapsed, 4),
+            "items_per_sec": round(total / elapsed, 2), "stages": stages}
+
+async def bench_analyze(logic_engine, texts):
+    # HybridBrain on its own, one item per call and in LLM_BATCH_SIZE batches,
+    # each with an empty verdict cache
+    brain = logic_engine.brain
+    out = {}
+    brain.verdict_cache = logic_engine.VerdictCache()
+    latencies = []
+    started = time.perf_counter()
+    for text in texts:
+        t = time.perf_counter()
+        await brain.analyze(text)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - started
+    out["single"] = {"items": len(texts), "items_per_sec": round(len(texts) / elapsed, 2),
+                     "latency_ms": percentiles(latencies)}
+
+    brain.verdict_cache = logic_engine.VerdictCache()
+    size = logic_engine.LLM_BATCH_SIZE
+    latencies = []
+    started = time.perf_counter()
+    for i in range(0, len(texts), size):
+        t = time.perf_counter()
+        await brain.analyze_batch(texts[i:i + size])
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - started
+    out["batch"] = {"items": len(texts), "batch_size": size, "items_per_sec": round(len(texts) / elapsed, 2),
+                    "batch_latency_ms": percentiles(latencies)}
+    return out
+
+async def run(args):
+    import aiohttp
+    import data_engine
+    import logic_engine
+    import telegram_engine
+
+    stub = StubGroq(latency=args.llm_latency, per_item=args.llm_per_item, error_rate=args.llm_error_rate,
+                    max_concurrency=args.llm_concurrency)
+    logic_engine.brain.llm = stub
+    data_engine.init_db()
+    embedder = "minilm"
+    if data_engine.vector_model is None or args.embedder == "hash":
+        data_engine.vector_model = HashingEmbedder()
+        embedder = "hash"
+
+    pages = load_html_fixtures()
+    corpus = load_telegram_corpus(args.messages)
+    report = {"fetch": None}
+
+    async with aiohttp.ClientSession() as session:
+        runner, port = await serve_fixtures(pages)
+        try:
+            html_items, report["fetch"] = await bench_fetch(data_engine, session, port, pages, args.fetch_rounds)
+        finally:
+            await runner.cleanup()
+
+    report["pipeline"] = await bench_pipeline(data_engine, telegram_engine, html_items, corpus, args.coalesce_window)
+    llm_pipeline = {"calls": stub.calls, "items": stub.items, "errors": stub.errors}
+    report["pipeline"]["llm"] = llm_pipeline
+
+    texts = [m["text"] for m in corpus[:args.analyze_items]]
+    report["analyze"] = await bench_analyze(logic_engine, texts)
+    report["embedder"] = embedder
+    data_engine.SIGNAL_WRITER.stop()
+    return report
+
+def compare(report, previous):
+    rows = [
+        ("fetch pages/s", ("fetch", "pages_per_sec"), True),
+        ("fetch p95 ms", ("fetch", "latency_ms", "p95"), False),
+        ("pipeline items/s", ("pipeline", "items_per_sec"), True),
+        ("analyze single items/s", ("analyze", "single", "items_per_sec"), True),
+        ("analyze batch items/s", ("analyze", "batch", "items_per_sec"), True),
+        ("peak rss MB", ("memory", "peak_rss_mb"), False),
+        ("peak python heap MB", ("memory", "peak_traced_mb"), False),
+    ]
+    stages = report.get("pipeline", {}).get("stages", {})
+    for name in stages:
+        rows.append((f"{name} p95 ms", ("pipeline", "stages", name, "batch_latency_ms", "p95"), False))
+
+    def dig(d, path):
+        for k in path:
+            if not isinstance(d, dict): return None
+            d = d.get(k)
+        return d
+
+    print(f"\n{'metric':28} {'previous':>12} {'current':>12} {'change':>9}")
+    for label, path, higher_is_better in rows:
+        old, new = dig(previous, path), dig(report, path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        worse = change < 0 if higher_is_better else change > 0
+        flag = "  !" if worse and abs(change) > 0.1 else ""
+        print(f"{label:28} {old:12.2f} {new:12.2f} {change:+8.1%}{flag}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline replay benchmark for the ingestion pipeline")
+    parser.add_argument("--messages", type=int, default=500, help="Telegram messages to replay")
+    parser.add_argument("--fetch-rounds", type=int, default=20)
+    parser.add_argument("--analyze-items", type=int, default=64)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="stub seconds per completion")
+    parser.add_argument("--llm-per-item", type=float, default=0.02, help="stub seconds per item in a completion")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-concurrency", type=int, default=int(os.environ.get("GROQ_MAX_CONCURRENCY", 4)))
+    parser.add_argument("--coalesce-window", type=float, default=0.05)
+    parser.add_argument("--embedder", choices=["auto", "hash"], default="auto")
+    parser.add_argument("--tracemalloc", action="store_true", help="also track the Python heap peak (slower)")
+    parser.add_argument("--out", default="bench_pipeline.json")
+    parser.add_argument("--compare", help="previous report to diff against")
+    args = parser.parse_args()
+
+    isolate_environment(tempfile.mkdtemp(prefix="bench_pipeline_"))
+    if args.tracemalloc: tracemalloc.start()
+    report = asyncio.run(run(args))
+    report["memory"] = {"peak_rss_mb": peak_rss_mb(),
+                        "peak_traced_mb": round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1) if args.tracemalloc else None}
+    report["meta"] = {"revision": git_revision(), "created": datetime.now(timezone.utc).isoformat(),
+                      "python": platform.python_version(), "platform": platform.platform()}
+    report["config"] = {k: v for k, v in vars(args).items() if k not in ("out", "compare")}
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    fetch, pipe, analyze = report["fetch"], report["pipeline"], report["analyze"]
+    print(f"embedder: {report['embedder']}")
+    print(f"fetch     {fetch['pages']} pages  {fetch['pages_per_sec']:.1f} pages/s  p95 {fetch['latency_ms']['p95']} ms")
+    print(f"pipeline  {pipe['items']} items -> {pipe['signals_written']} signals in {pipe['seconds']:.2f}s  "
+          f"{pipe['items_per_sec']:.1f} items/s  ({pipe['llm']['calls']} LLM calls, {pipe['stories']} stories)")
+    for name, s in pipe["stages"].items():
+        lat = s["batch_latency_ms"]
+        print(f"  {name:8} {s['processed']:6} items {s['batches']:5} batches  "
+              f"p50 {lat['p50']} / p95 {lat['p95']} / p99 {lat['p99']} ms  errors {s['errors']}")
+    print(f"analyze   single {analyze['single']['items_per_sec']:.1f} items/s  batch {analyze['batch']['items_per_sec']:.1f} items/s")
+    print(f"memory    peak rss {report['memory']['peak_rss_mb']} MB")
+    print(f"wrote {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
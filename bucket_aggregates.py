@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+# resolution -> (bucket seconds, buckets kept)
+RESOLUTIONS = {
+    "1m": (60, 360),
+    "5m": (300, 576),
+    "1h": (3600, 2160),
+}
+# PostgREST caps a response at 1000 rows by default
+PAGE_SIZE = 1000
+
+def _epoch(ts):
+    if isinstance(ts, (int, float)): return float(ts)
+    try: return datetime.fromisoformat(str(ts).replace('Z', '+00:00')).timestamp()
+    except ValueError: return time.time()
+
+def _sentiment(row):
+    try:
+        vectors = row.get('vectors')
+        if isinstance(vectors, str): vectors = json.loads(vectors)
+        return vectors.get('sentiment_type', 'RISK')
+    except Exception:
+        return 'RISK'
+
+class BucketAggregator:
+    # Rolling 1m / 5m / 1h aggregates of written signals: counts, sums and
+    # maxima of risk and opportunity scores. Each resolution keeps a fixed
+    # number of buckets, so the volatility chart reads a bounded series no
+    # matter how large the signals table grows. Rows returned by add() are the
+    # full current values of the touched buckets, ready to upsert, so a bucket
+    # that is not in memory (older rows replayed from the spool, or any bucket
+    # after a restart) is first read back through `load_missing(keys)`.
+    def __init__(self, resolutions=RESOLUTIONS, load_missing=None):
+        self.resolutions = resolutions
+        self.load_missing = load_missing
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(resolution, start):
+        return f"{resolution}:{int(start)}"
+
+    def _empty(self, resolution, start):
+        return {
+            "bucket_key": self.key(resolution, start), "resolution": resolution,
+            "bucket_start": datetime.fromtimestamp(start, timezone.utc).isoformat(),
+            "count": 0, "risk_count": 0, "risk_sum": 0, "risk_max": 0,
+            "opp_count": 0, "opp_sum": 0, "opp_max": 0, "trend_sum": 0,
+        }
+
+    def _keys(self, row):
+        ts = _epoch(row.get('timestamp'))
+        return [(res, ts - ts % width) for res, (width, _) in self.resolutions.items()]
+
+    def _load_missing(self, signals):
+        with self._lock:
+            missing = {self.key(res, start) for row in signals for res, start in self._keys(row)} - set(self._buckets)
+        if not missing or self.load_missing is None: return
+        found = {row["bucket_key"]: dict(row) for row in self.load_missing(sorted(missing))}
+        with self._lock:
+            for k in missing:
+                if k in self._buckets: continue
+                res, start = k.split(":")
+                self._buckets[k] = found.get(k) or self._empty(res, float(start))
+
+    def add(self, signals):
+        # a failed read raises here rather than restarting the bucket from zero
+        self._load_missing(signals)
+        touched = {}
+        with self._lock:
+            for row in signals:
+                score = int(row.get('risk_score') or 0)
+                is_opp = _sentiment(row) == 'OPPORTUNITY'
+                for res, start in self._keys(row):
+                    k = self.key(res, start)
+                    b = self._buckets.get(k)
+                    if b is None: b = self._buckets[k] = self._empty(res, start)
+                    b["count"] += 1
+                    side = "opp" if is_opp else "risk"
+                    b[f"{side}_count"] += 1
+                    b[f"{side}_sum"] += score
+                    b[f"{side}_max"] = max(b[f"{side}_max"], score)
+                    b["trend_sum"] += score if is_opp else -score
+                    touched[k] = b
+            self._trim()
+            return [dict(b) for b in touched.values()]
+
+    def load(self, rows):
+        with self._lock:
+            for row in rows:
+                if row.get("resolution") in self.resolutions:
+                    self._buckets[row["bucket_key"]] = dict(row)
+            self._trim()
+
+    def _trim(self, now=None):
+        now = now or time.time()
+        for k in list(self._buckets):
+            res, start = k.split(":")
+            width, keep = self.resolutions[res]
+            if float(start) < now - width * keep:
+                del self._buckets[k]
+
+    def rows(self, resolution=None):
+        with self._lock:
+            rows = [dict(b) for b in self._buckets.values() if resolution in (None, b["resolution"])]
+        return sorted(rows, key=lambda b: b["bucket_key"])
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+def fetch_buckets(db, resolution, since, page_size=PAGE_SIZE):
+    # every persisted bucket of one resolution from `since` (epoch seconds),
+    # oldest first, paged so no response is silently truncated
+    rows = []
+    while True:
+        res = (db.table('signal_buckets').select("*").eq('resolution', resolution)
+               .gte('bucket_start', _iso(since)).order('bucket_start')
+               .range(len(rows), len(rows) + page_size - 1).execute())
+        page = res.data or []
+        rows.extend(page)
+        if len(page) < page_size: return rows
+
+def fetch_bucket_keys(db, keys, chunk=100):
+    # the persisted rows for specific bucket keys (missing keys are just absent)
+    if db is None: return []
+    rows = []
+    for i in range(0, len(keys), chunk):
+        res = db.table('signal_buckets').select("*").in_('bucket_key', list(keys[i:i + chunk])).execute()
+        rows.extend(res.data or [])
+    return rows
+
+def open_buckets(db, now=None):
+    # the buckets new signals can still land in: the current one and the one
+    # before it at each resolution
+    now = now or time.time()
+    rows = []
+    for res, (width, _) in RESOLUTIONS.items():
+        rows.extend(fetch_buckets(db, res, now - now % width - width))
+    return rows
+
+def chart_series(rows, now=None):
+    # 1m buckets for the last 6h, 5m back to 2 days, 1h beyond that
+    now = now or time.time()
+    fine_until = {"1m": now - 6 * 3600, "5m": now - 2 * 86400}
+    series = []
+    for row in rows:
+        start = _epoch(row["bucket_start"])
+        res = row["resolution"]
+        if res == "1m" and start >= fine_until["1m"]: series.append(row)
+        elif res == "5m" and fine_until["5m"] <= start < fine_until["1m"]: series.append(row)
+        elif res == "1h" and start < fine_until["5m"]: series.append(row)
+    return sorted(series, key=lambda r: _epoch(r["bucket_start"]))
@@ -1,18 +1,30 @@
 import asyncio
 import aiohttp
-from bs4 import BeautifulSoup 
 import re
 from supabase import create_client, Client
 from datetime import datetime, timezone
 import logic_engine
+import html_extract
+import source_registry
+import pipeline
+import local_db
+import event_bus
+from signal_writer import SignalWriter
+from link_store import SeenLinks
+from bucket_aggregates import BucketAggregator, fetch_bucket_keys, open_buckets
 import ground_truth_engine
 import json
 import time
+import hashlib
 import os
+import random
+import weakref
 import streamlit as st
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from vector_index import VectorIndex, normalize
+from embedding_cache import EmbeddingCache
+from story_clusters import StoryClusters
 
 def get_secret(key):
     if key in os.environ: return os.environ[key]
@@ -21,12 +33,49 @@ def get_secret(key):
     except: pass
     return None
 
-RECENT_NEWS_VECTORS = [] 
+NEWS_INDEX = VectorIndex(capacity=20000, max_age=72 * 3600)
+STORIES = StoryClusters(threshold=float(os.environ.get("STORY_THRESHOLD", 0.6)), max_age=72 * 3600)
+WARM_START_ROWS = 1000
+BATCH_SCORING_MIN = 2
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", 256))
+PIPELINE_SCORE_WORKERS = int(os.environ.get("PIPELINE_SCORE_WORKERS", 2))
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+EMBEDDING_CACHE = EmbeddingCache(os.environ.get("EMBEDDING_CACHE_DIR", ".cache/embeddings"), capacity=50000, namespace=EMBEDDING_MODEL)
 vector_model = None
 supabase: Client = None
-SEEN_LINKS = set()
+SEEN_LINKS = SeenLinks(max_items=50000, max_age=14 * 86400, path=os.environ.get("SEEN_LINKS_PATH"))
+IN_FLIGHT = SeenLinks(max_items=10000, max_age=3600)
+SIGNAL_WRITER = SignalWriter(lambda: supabase, spool_path=os.environ.get("SPOOL_PATH", ".cache/spool.sqlite"))
+BUCKETS = BucketAggregator(load_missing=lambda keys: fetch_bucket_keys(supabase, keys))
+BUCKET_WRITER = SignalWriter(lambda: supabase, table="signal_buckets", on_conflict="bucket_key",
+                             spool_path=os.environ.get("SPOOL_PATH", ".cache/spool.sqlite"))
+
+def _signals_written(rows):
+    # runs on the writer's flush thread: land the bucket update first, so one
+    # event covers both tables
+    try:
+        BUCKET_WRITER.add(BUCKETS.add(rows))
+        BUCKET_WRITER.flush()
+    finally:
+        event_bus.publish_signals(rows)
+
+SIGNAL_WRITER.listeners.append(_signals_written)
+# a sample of LLM rejects, as negatives for the embedding pre-classifier
+REJECT_WRITER = SignalWriter(lambda: supabase, table="signal_rejects", on_conflict="link",
+                             spool_path=os.environ.get("SPOOL_PATH", ".cache/spool.sqlite"))
+REJECT_SAMPLE_RATE = float(os.environ.get("REJECT_SAMPLE_RATE", 0.25))
 
 DEMO_MODE = False
+WEATHER_STATUS = "CLEAR"
+WEATHER_BY_DISTRICT = {}
+
+PAGE_STATE = {}
+DEFAULT_PROFILE = html_extract.compile_profile("default")
+HREF_RE = re.compile(r"""<a\s[^>]*?href\s*=\s*["']([^"']+)""", re.IGNORECASE)
+
+def parse_timestamp(value):
+    try: return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except: return time.time()
 
 def init_db():
     global supabase, vector_model
@@ -39,101 +88,161 @@ def init_db():
         try:
             supabase = create_client(url, key)
         except: pass
+    elif get_secret("LOCAL_DB_PATH"):
+        supabase = local_db.LocalClient(get_secret("LOCAL_DB_PATH"))
+
+    if supabase is not None:
+        # seed the in-memory buckets first, or the first upserts would replace
+        # the persisted aggregates with partial ones
+        try:
+            BUCKETS.load(open_buckets(supabase))
+        except: pass
+        SIGNAL_WRITER.start()
+        BUCKET_WRITER.start()
+        REJECT_WRITER.start()
             
     try:
         if vector_model is None:
-            vector_model = SentenceTransformer('all-MiniLM-L6-v2')
+            vector_model = SentenceTransformer(EMBEDDING_MODEL)
     except: pass
     
     return supabase
 
-def check_swarm_and_dedupe(new_text):
-    global RECENT_NEWS_VECTORS
-    if not vector_model: return False, False, None
-    
+DEDUPE_THRESHOLD = 0.75
+
+def check_swarm_and_dedupe_batch(texts):
+    # (is_duplicate, story snapshot, vector) per text; duplicates still count
+    # towards their story's size
+    if not texts: return []
+    if not vector_model: return [(False, None, None) for _ in texts]
+
     try:
-        new_vec = vector_model.encode([new_text])[0]
-        
-        if not RECENT_NEWS_VECTORS:
-            return False, False, new_vec
-            
-        cached_vecs = [v[1] for v in RECENT_NEWS_VECTORS]
-        similarities = cosine_similarity([new_vec], cached_vecs)[0]
-        
-       
-        if np.any(similarities > 0.75):
-            return True, False, new_vec
+        new_vecs = normalize(EMBEDDING_CACHE.encode(vector_model, texts))
+        cache_hits = NEWS_INDEX.query(new_vecs) > DEDUPE_THRESHOLD
 
-        return False, False, new_vec
-        
-    except:
-        return False, False, None
+        # an item is also a duplicate of an earlier, kept item of the same batch
+        batch_sims = np.triu(new_vecs @ new_vecs.T, k=1) > DEDUPE_THRESHOLD
+        is_duplicate = cache_hits.copy()
+        for j in range(len(texts)):
+            if is_duplicate[j]: continue
+            if np.any(batch_sims[:j, j] & ~is_duplicate[:j]):
+                is_duplicate[j] = True
 
+        stories = STORIES.assign(new_vecs)
+        return [(bool(d), story, v) for d, story, v in zip(is_duplicate, stories, new_vecs)]
 
-async def beam_to_cloud(news_items, weather_status):
-    db = init_db()
-    if not db: return
-    
-    payload = []
-    items_to_cache = [] 
-    
-    tasks = []
-    processing_queue = []
+    except:
+        return [(False, None, None) for _ in texts]
+
+def check_swarm_and_dedupe(new_text):
+    return check_swarm_and_dedupe_batch([new_text])[0]
 
-    context_str = ""
-    if RECENT_NEWS_VECTORS:
-        last_3 = [item[0] for item in RECENT_NEWS_VECTORS[-3:]]
-        context_str = " | ".join(last_3)
 
+def dedupe_items(news_items):
+    candidates = []
     for item in news_items:
-        text = item.get('full_text', item['title'])
-        is_telegram = "Telegram" in item.get('source', '')
-        
-        if item['link'] in SEEN_LINKS:
+        if item['link'] in SEEN_LINKS or item['link'] in IN_FLIGHT:
             continue
-            
-        is_duplicate, is_swarm, new_vec = check_swarm_and_dedupe(text)
+        candidates.append((item, item.get('full_text', item['title'])))
+
+    checks = check_swarm_and_dedupe_batch([text for _, text in candidates])
+
+    processing_queue = []
+    rescoring = set()
+    for (item, text), (is_duplicate, story, new_vec) in zip(candidates, checks):
+        is_telegram = "Telegram" in item.get('source', '')
         
+        # a duplicate that makes its story jump in size is kept for a re-score
         if is_duplicate:
-            SEEN_LINKS.add(item['link'])
-            continue
+            if not story or story['id'] in rescoring or not STORIES.jumped(story['id']):
+                SEEN_LINKS.add(item['link'])
+                continue
+            rescoring.add(story['id'])
             
-        tasks.append(logic_engine.calculate_risk(text, context_str))
-        processing_queue.append((item, text, is_telegram, is_swarm, new_vec))
+        processing_queue.append((item, text, is_telegram, story, new_vec))
+    # marked only once the whole batch is through, so a batch that raises
+    # leaves nothing stuck in IN_FLIGHT
+    for q in processing_queue: IN_FLIGHT.add(q[0]['link'])
+    return processing_queue
+
+async def _llm_scores(queue, context_str):
+    if len(queue) >= BATCH_SCORING_MIN:
+        return await logic_engine.calculate_risk_batch([q[1] for q in queue], context_str, [q[4] for q in queue])
+    return await asyncio.gather(*(logic_engine.calculate_risk(q[1], context_str, q[4]) for q in queue))
 
-    if not tasks: return
+def _story_scoring_order(processing_queue, indices=None):
+    # items that need the LLM: anything without a story, plus one item per
+    # story that has no verdict yet or has jumped in size
+    picked, stories = [], set()
+    for i in range(len(processing_queue)) if indices is None else indices:
+        story = processing_queue[i][3]
+        if story is None:
+            picked.append(i)
+        elif story['id'] not in stories and STORIES.needs_score(story['id']):
+            stories.add(story['id'])
+            picked.append(i)
+    return picked
 
-    results = await asyncio.gather(*tasks)
+async def score_items(processing_queue):
+    if not processing_queue: return []
+    context_str = " | ".join(NEWS_INDEX.recent_texts(3))
 
-    for (item, text, is_telegram, is_swarm, new_vec), analysis in zip(processing_queue, results):
+    results = [None] * len(processing_queue)
+    llm_scored = set()
+    # failed LLM verdicts per story: not kept on the story, but reused for
+    # the rest of this batch rather than retried member by member
+    failed = {}
+    pending = _story_scoring_order(processing_queue)
+    while True:
+        if pending:
+            for i, analysis in zip(pending, await _llm_scores([processing_queue[i] for i in pending], context_str)):
+                results[i] = analysis
+                llm_scored.add(i)
+                story = processing_queue[i][3]
+                verdict = analysis.get('verdict')
+                if story and verdict:
+                    if "Neural" in verdict[1]: failed[story['id']] = verdict
+                    else: STORIES.mark_scored(story['id'], verdict)
+        # the rest of each story reuses the verdict, finalised against its
+        # own text; members whose representative was prefiltered go round
+        # again, still one per story
+        for i, q in enumerate(processing_queue):
+            if results[i] is None and q[3]:
+                verdict = STORIES.verdict(q[3]['id']) or failed.get(q[3]['id'])
+                if verdict is not None: results[i] = logic_engine.brain.apply_verdict(q[1], verdict)
+        unresolved = [i for i, r in enumerate(results) if r is None]
+        if not unresolved: break
+        pending = _story_scoring_order(processing_queue, unresolved)
+
+    scored = []
+    for i, ((item, text, is_telegram, story, new_vec), analysis) in enumerate(zip(processing_queue, results)):
         
        
         if analysis.get('priority') == "TRASH":
+            if i in llm_scored and analysis.get('reason') == "AI Filter" and random.random() < REJECT_SAMPLE_RATE:
+                REJECT_WRITER.add([{"link": item['link'], "timestamp": item['published'], "source": item['source'],
+                                    "headline": item['title'], "full_text": text}])
             SEEN_LINKS.add(item['link'])
+            IN_FLIGHT.discard(item['link'])
             continue
 
         
         if "Neural Offline" in analysis.get('reason', ''):
             SEEN_LINKS.add(item['link'])
+            IN_FLIGHT.discard(item['link'])
             continue
 
       
         if analysis['score'] < 25:
-            valid_low_score_keywords = [
-                "traffic", "road", "lane", "highway", "expressway", "police", 
-                "check", "queue", "fuel", "gas", "petrol", "diesel", 
-                "strike", "protest", "accident", "crash", "delay", "clear", 
-                "normal", "blocked", "closed", "fallen", "tree", "electricity", "power",
-                "water", "train", "bus", "station", "weather", "rain"
-            ]
-            
-            text_lower = text.lower()
-            is_relevant = any(kw in text_lower for kw in valid_low_score_keywords)
+            is_relevant = logic_engine.brain.is_low_score_relevant(text)
             
             if not is_relevant:
                 SEEN_LINKS.add(item['link'])
+                IN_FLIGHT.discard(item['link'])
                 continue
 
+        vectors = dict(analysis['vectors'])
+        if story: vectors.update(story_id=story['id'], swarm_size=story['size'])
         signal = {
             "timestamp": item['published'],
             "source": item['source'],
@@ -143,77 +252,138 @@ async def beam_to_cloud(news_items, weather_status):
             "risk_score": int(analysis['score']),
             "priority": analysis['priority'],
             "reason": analysis['reason'],
-            "vectors": json.dumps(analysis['vectors'])
+            "vectors": json.dumps(vectors)
         }
-        payload.append(signal)
-        
-        if new_vec is not None:
-            items_to_cache.append((text, new_vec))
+        scored.append((signal, text, new_vec))
+    return scored
+
+def write_signals(scored):
+    payload = [signal for signal, _, _ in scored]
+    items_to_cache = [(text, vec) for _, text, vec in scored if vec is not None]
 
     try:
         if payload:
-            db.table('signals').upsert(payload, on_conflict='link').execute()
+            # write-behind: from here the writer owns delivery (retry, spool, replay)
+            SIGNAL_WRITER.add(payload)
             for p in payload: SEEN_LINKS.add(p['link'])
-            for txt, vec in items_to_cache:
-                RECENT_NEWS_VECTORS.append((txt, vec))
-                if len(RECENT_NEWS_VECTORS) > 100: RECENT_NEWS_VECTORS.pop(0)
+            if items_to_cache:
+                NEWS_INDEX.insert([t for t, _ in items_to_cache], [v for _, v in items_to_cache])
+        EMBEDDING_CACHE.flush()
     except Exception: pass
+    finally:
+        for p in payload: IN_FLIGHT.discard(p['link'])
+    return []
+
+async def beam_to_cloud(news_items, weather_status):
+    db = init_db()
+    if not db: return
+
+    processing_queue = dedupe_items(news_items)
+    if not processing_queue: return
+
+    write_signals(await score_items(processing_queue))
+    await asyncio.to_thread(SIGNAL_WRITER.flush)
+
+def _release_in_flight(batch):
+    # score and write entries both lead with a dict carrying the link and
+    # source; a batch that failed its retries gives its links back and resets
+    # its pages, so the next poll picks the items up again (Telegram messages
+    # are not refetched, so for them the stage retry is the only one)
+    items = [entry[0] for entry in batch]
+    for item in items: IN_FLIGHT.discard(item['link'])
+    reset_page_state({item.get('source') for item in items})
+
+def build_pipeline():
+    # fetchers and the Telegram listener submit raw items; each stage works on
+    # micro-batches and hands its output to the next bounded queue
+    return pipeline.Pipeline([
+        pipeline.Stage("dedupe", lambda batch: asyncio.to_thread(dedupe_items, batch),
+                       workers=1, batch_size=64, max_wait=0.2, queue_size=PIPELINE_QUEUE_SIZE,
+                       on_error=lambda batch: reset_page_state({item.get('source') for item in batch})),
+        pipeline.Stage("score", score_items,
+                       workers=PIPELINE_SCORE_WORKERS, batch_size=logic_engine.LLM_BATCH_SIZE, max_wait=0.5, queue_size=PIPELINE_QUEUE_SIZE,
+                       retries=1, on_error=_release_in_flight),
+        pipeline.Stage("write", lambda batch: asyncio.to_thread(write_signals, batch),
+                       workers=1, batch_size=100, max_wait=1.0, queue_size=PIPELINE_QUEUE_SIZE,
+                       on_error=_release_in_flight),
+    ])
+
+_PIPELINES = weakref.WeakKeyDictionary()
+
+def get_pipeline():
+    # one running pipeline per event loop (HTML worker and Telegram listener)
+    loop = asyncio.get_running_loop()
+    p = _PIPELINES.get(loop)
+    if p is None:
+        p = _PIPELINES[loop] = build_pipeline()
+        p.start()
+    return p
+
+async def shutdown_pipeline(drain=True):
+    p = _PIPELINES.pop(asyncio.get_running_loop(), None)
+    if p: await p.stop(drain=drain)
+
+async def submit(news_items):
+    # False when there is no database to hand the items to
+    if not init_db(): return False
+    await get_pipeline().submit(news_items)
+    return True
 
 
 async def fetch_html(session, target):
     headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.0.0 Safari/537.36"
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.0.0 Safari/537.36",
+        "Cache-Control": "no-cache"
     }
     
+    state = PAGE_STATE.setdefault(target['url'], {"source": target['name']})
+    if state.get('etag'): headers["If-None-Match"] = state['etag']
+    if state.get('last_modified'): headers["If-Modified-Since"] = state['last_modified']
+    
     try:
-        fresh_url = f"{target['url']}?t={int(time.time())}"
-        async with session.get(fresh_url, headers=headers, timeout=15) as response:
-            if response.status != 200: 
+        async with session.get(target['url'], headers=headers, timeout=15) as response:
+            if response.status == 304:
                 return []
+            if response.status != 200: 
+                return None
             
             html_content = await response.text()
-            soup = BeautifulSoup(html_content, 'html.parser')
+            # the set of article links is the part of the page we care about;
+            # if it is unchanged there is nothing new to parse
+            digest = hashlib.sha1("\n".join(HREF_RE.findall(html_content)).encode("utf-8")).hexdigest()
+            seen = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified"), "digest": digest}
+            if digest == state.get('digest'):
+                state.update(seen)
+                return []
+            # kept aside until the caller has handed the items off, so a
+            # failed handoff fetches and parses the page again
+            state['pending'] = seen
+
+            profile = target.get('profile') or DEFAULT_PROFILE
             batch = []
-            
-            
-            selectors = [
-                'h4.posts-listunit-title a',  
-                'h1 a',                       
-                'h3 a',                       
-                '.col-md-8 h3 a', 
-                '.news-custom-heading a', 
-                '.story-text a', 
-                '.news-block a', 
-                '.main-news-block a',
-                'h2 a'                        
-            ]
-            
-            seen_in_batch = set()
-
-            for selector in selectors:
-                for item in soup.select(selector, limit=10):
-                    if item and item.get_text(strip=True):
-                        title = item.get_text(strip=True)
-                        href = item['href']
-                        if href.startswith('/'): 
-                            base_url_parts = target['url'].split('/')
-                            if len(base_url_parts) >= 3:
-                                base_url = f"{base_url_parts[0]}//{base_url_parts[2]}"
-                                href = base_url + href
-                        
-                        if href not in seen_in_batch:
-                            seen_in_batch.add(href)
-                            batch.append({
-                                "title": f"[{target['name']}] {title}",
-                                "link": href,
-                                "source": target['name'],
-                                "published": datetime.now(timezone.utc).isoformat()
-                            })
+            for title, href in html_extract.extract_links(html_content, target['url'], profile):
+                batch.append({
+                    "title": f"[{target['name']}] {title}",
+                    "link": href,
+                    "source": target['name'],
+                    "published": datetime.now(timezone.utc).isoformat()
+                })
 
             return batch[:12]
             
     except Exception:
-        return []
+        return None
+
+def commit_page_state(url):
+    state = PAGE_STATE.get(url)
+    if state and 'pending' in state: state.update(state.pop('pending'))
+
+def reset_page_state(sources):
+    # forget what was last seen on these sources' pages, so the next poll
+    # fetches and submits their items again
+    for state in PAGE_STATE.values():
+        if state.get('source') in sources:
+            for k in ('etag', 'last_modified', 'digest', 'pending'): state.pop(k, None)
 
 async def async_listen_loop():
     db = init_db()
@@ -222,36 +392,49 @@ async def async_listen_loop():
         try:
             res = db.table('signals').select("link").order('timestamp', desc=True).limit(300).execute()
             if res.data:
-                for r in res.data: SEEN_LINKS.add(r['link'])
+                for r in reversed(res.data): SEEN_LINKS.add(r['link'])
 
             if vector_model:
-                res = db.table('signals').select("headline").order('timestamp', desc=True).limit(50).execute()
+                since = datetime.fromtimestamp(time.time() - NEWS_INDEX.max_age, timezone.utc).isoformat()
+                res = db.table('signals').select("headline, timestamp").gte('timestamp', since).order('timestamp', desc=True).limit(WARM_START_ROWS).execute()
                 if res.data:
-                    texts = [r['headline'] for r in res.data]
-                    vecs = vector_model.encode(texts)
-                    for t, v in zip(texts, vecs): RECENT_NEWS_VECTORS.append((t, v))
+                    rows = res.data[::-1]
+                    texts = [r['headline'] for r in rows]
+                    stamps = [parse_timestamp(r['timestamp']) for r in rows]
+                    vecs = EMBEDDING_CACHE.encode(vector_model, texts)
+                    NEWS_INDEX.insert(texts, vecs, stamps)
+                    STORIES.assign(vecs, stamps)
+                    EMBEDDING_CACHE.flush()
         except: pass
 
-    targets = [
-        {"name": "Ada Derana", "url": "http://www.adaderana.lk/hot-news/", "type": "html"},
-        {"name": "Newswire", "url": "https://www.newswire.lk/", "type": "html"}
-    ]
+    async with aiohttp.ClientSession() as session:
+        tasks = [asyncio.create_task(poll_weather(session))]
+        for source in source_registry.load_sources():
+            tasks.append(asyncio.create_task(poll_source(session, source_registry.SourceSchedule(source))))
+        await asyncio.gather(*tasks)
 
+async def poll_weather(session):
+    global WEATHER_STATUS, WEATHER_BY_DISTRICT
+    client = ground_truth_engine.WeatherClient(session)
     while True:
-        rain_mm, weather_status = ground_truth_engine.fetch_weather_risk()
-        
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for t in targets:
-                tasks.append(fetch_html(session, t))
-            
-            results = await asyncio.gather(*tasks)
-            all_news = [item for batch in results for item in batch]
-            
-            if all_news: 
-                await beam_to_cloud(all_news, weather_status)
-        
-        if DEMO_MODE:
-            await asyncio.sleep(10)
-        else:
-            await asyncio.sleep(60)
+        try:
+            WEATHER_BY_DISTRICT = await client.fetch_districts()
+            _, _, WEATHER_STATUS = ground_truth_engine.worst_status(WEATHER_BY_DISTRICT)
+        except Exception: pass
+        await asyncio.sleep(10 if DEMO_MODE else 60)
+
+async def poll_source(session, schedule):
+    while True:
+        try:
+            batch = await fetch_html(session, schedule.source)
+            if batch is None:
+                schedule.record(0, failed=True)
+            else:
+                fresh = [item for item in batch if item['link'] not in SEEN_LINKS]
+                schedule.record(len(fresh))
+                # an unhandled page keeps its old validators and is fetched again
+                if not fresh or await submit(fresh):
+                    commit_page_state(schedule.source['url'])
+        except Exception:
+            schedule.record(0, failed=True)
+        await asyncio.sleep(schedule.next_delay(cap=10 if DEMO_MODE else None))
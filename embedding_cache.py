@@ -0,0 +1,110 @@
+import hashlib
+import os
+import threading
+import time
+import numpy as np
+
+class EmbeddingCache:
+    # Content-addressed embedding store backed by three memory-mapped .npy files
+    # (vectors, sha1 hex keys, last-used stamps). The key -> slot map is rebuilt from
+    # the keys file on open, so nothing besides the mmaps has to be flushed.
+    def __init__(self, path, capacity=50000, namespace=""):
+        self.path = path
+        self.capacity = capacity
+        self.namespace = namespace
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._vecs = None
+        try:
+            self._open()
+        except Exception:
+            self._vecs = None
+
+    def _files(self):
+        return [os.path.join(self.path, f) for f in ("vectors.npy", "keys.npy", "used.npy")]
+
+    def _open(self):
+        vec_f, key_f, used_f = self._files()
+        if not os.path.exists(vec_f): return
+        vecs = np.load(vec_f, mmap_mode="r+")
+        keys = np.load(key_f, mmap_mode="r+")
+        used = np.load(used_f, mmap_mode="r+")
+        if len(vecs) != self.capacity or len(keys) != self.capacity: return
+        self._vecs, self._keys, self._used = vecs, keys, used
+        self._slots = {bytes(k): i for i, k in enumerate(keys) if used[i] > 0}
+
+    def _create(self, dim):
+        os.makedirs(self.path, exist_ok=True)
+        vec_f, key_f, used_f = self._files()
+        self._vecs = np.lib.format.open_memmap(vec_f, mode="w+", dtype=np.float32, shape=(self.capacity, dim))
+        self._keys = np.lib.format.open_memmap(key_f, mode="w+", dtype="S40", shape=(self.capacity,))
+        self._used = np.lib.format.open_memmap(used_f, mode="w+", dtype=np.float64, shape=(self.capacity,))
+        self._slots = {}
+
+    def key(self, text):
+        return hashlib.sha1(f"{self.namespace}\x00{text}".encode("utf-8")).hexdigest().encode("ascii")
+
+    def __len__(self):
+        return len(self._slots)
+
+    def get(self, texts):
+        found = {}
+        now = time.time()
+        with self._lock:
+            if self._vecs is None: return found
+            for i, text in enumerate(texts):
+                slot = self._slots.get(self.key(text))
+                if slot is not None:
+                    self._used[slot] = now
+                    found[i] = np.array(self._vecs[slot])
+        return found
+
+    def put(self, texts, vecs):
+        if not self.enabled or not len(texts): return
+        vecs = np.asarray(vecs, dtype=np.float32)
+        now = time.time()
+        try:
+            with self._lock:
+                if self._vecs is None or self._vecs.shape[1] != vecs.shape[1]:
+                    self._create(vecs.shape[1])
+                for text, vec in zip(texts, vecs):
+                    k = self.key(text)
+                    slot = self._slots.get(k)
+                    if slot is None: slot = self._free_slot()
+                    self._vecs[slot] = vec
+                    self._keys[slot] = k
+                    self._used[slot] = now
+                    self._slots[k] = slot
+        except Exception:
+            self.enabled = False
+
+    def _free_slot(self):
+        if len(self._slots) < self.capacity:
+            return int(np.argmin(self._used))
+        # full: evict the least recently used tenth in one go
+        victims = np.argpartition(self._used, self.capacity // 10)[:max(1, self.capacity // 10)]
+        for v in victims:
+            self._slots.pop(bytes(self._keys[v]), None)
+            self._used[v] = 0.0
+        return int(victims[0])
+
+    def flush(self):
+        with self._lock:
+            if self._vecs is None: return
+            for arr in (self._vecs, self._keys, self._used):
+                arr.flush()
+
+    def encode(self, model, texts):
+        texts = list(texts)
+        found = self.get(texts)
+        missing = [i for i in range(len(texts)) if i not in found]
+        self.hits += len(found)
+        self.misses += len(missing)
+        if missing:
+            new_vecs = model.encode([texts[i] for i in missing])
+            self.put([texts[i] for i in missing], new_vecs)
+            for i, v in zip(missing, new_vecs): found[i] = v
+        return np.array([found[i] for i in range(len(texts))], dtype=np.float32)
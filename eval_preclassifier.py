@@ -0,0 +1,71 @@
+import argparse
+import os
+import numpy as np
+import local_db
+from preclassifier import PreClassifier, load_training_rows
+from vector_index import normalize
+
+THRESHOLDS = (0.8, 0.9, 0.95, 0.99)
+
+def connect():
+    url, key = os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")
+    if url and key:
+        from supabase import create_client
+        return create_client(url, key)
+    if os.environ.get("LOCAL_DB_PATH"):
+        return local_db.LocalClient(os.environ["LOCAL_DB_PATH"])
+    raise SystemExit("set SUPABASE_URL/SUPABASE_KEY or LOCAL_DB_PATH")
+
+def embed(texts):
+    import data_engine
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(data_engine.EMBEDDING_MODEL)
+    vectors = normalize(data_engine.EMBEDDING_CACHE.encode(model, texts))
+    data_engine.EMBEDDING_CACHE.flush()
+    return vectors
+
+def precision_recall(predicted, actual):
+    tp = int(np.sum(predicted & actual))
+    precision = tp / max(1, int(np.sum(predicted)))
+    recall = tp / max(1, int(np.sum(actual)))
+    return precision, recall
+
+def evaluate(clf, vectors, labels, thresholds=THRESHOLDS):
+    # precision/recall of local decisions against the LLM verdicts, per
+    # confidence threshold; "local" is the share of items that skip the LLM
+    labels = np.asarray(labels, dtype=int)
+    report = []
+    for t in thresholds:
+        decision = clf.decide(vectors, reject_confidence=t, accept_confidence=t)
+        rp, rr = precision_recall(decision < 0, labels == 0)
+        ap, ar = precision_recall(decision > 0, labels == 1)
+        report.append({"confidence": t, "reject_precision": rp, "reject_recall": rr,
+                       "accept_precision": ap, "accept_recall": ar, "local": float(np.mean(decision != 0))})
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate (and optionally save) the embedding pre-classifier")
+    parser.add_argument("--limit", type=int, default=5000, help="rows per class to load")
+    parser.add_argument("--holdout", type=float, default=0.2, help="newest share of rows kept for testing")
+    parser.add_argument("--save", action="store_true", help="refit on all rows and write PRECLASSIFIER_PATH")
+    args = parser.parse_args()
+
+    rows = load_training_rows(connect(), args.limit)
+    labels = np.array([r[1] for r in rows])
+    print(f"{len(rows)} rows: {int(labels.sum())} accepted, {int((labels == 0).sum())} rejected")
+    if len(set(labels)) < 2: raise SystemExit("need both accepted and rejected rows")
+    vectors = embed([r[0] for r in rows])
+
+    # time-ordered split, so the test set is "news the model has not seen yet"
+    split = int(len(rows) * (1 - args.holdout))
+    clf = PreClassifier().fit(vectors[:split], labels[:split])
+    print(f"{'confidence':>10} {'rej P':>7} {'rej R':>7} {'acc P':>7} {'acc R':>7} {'local':>7}")
+    for r in evaluate(clf, vectors[split:], labels[split:]):
+        print(f"{r['confidence']:>10} {r['reject_precision']:7.3f} {r['reject_recall']:7.3f} "
+              f"{r['accept_precision']:7.3f} {r['accept_recall']:7.3f} {r['local']:7.1%}")
+
+    if args.save:
+        path = os.environ.get("PRECLASSIFIER_PATH", ".cache/preclassifier.npz")
+        clf = PreClassifier(path=path).fit(vectors, labels)
+        clf.save()
+        print(f"saved {path} ({clf.samples} samples)")
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+class EventBus:
+    # In-process change notifications. Publishers bump a version counter;
+    # dashboard sessions compare it with the version they last rendered and
+    # only re-query and redraw once it has moved.
+    def __init__(self, history=256):
+        self.version = 0
+        self._events = deque(maxlen=history)
+        self._cond = threading.Condition()
+
+    def publish(self, event):
+        with self._cond:
+            self.version += 1
+            self._events.append((self.version, time.time(), event))
+            self._cond.notify_all()
+
+    def wait(self, since, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > since, timeout=timeout)
+            return self.version
+
+    def events_since(self, since):
+        with self._cond:
+            return [e for v, _, e in self._events if v > since]
+
+BUS = EventBus()
+
+def publish_signals(rows):
+    BUS.publish({"type": "signals", "count": len(rows), "links": [r.get('link') for r in rows]})
+
+async def _realtime_listen(url, key, bus):
+    from supabase import acreate_client
+    client = await acreate_client(url, key)
+    channel = client.channel("signals-feed")
+    channel.on_postgres_changes("INSERT", schema="public", table="signals",
+                                callback=lambda payload: bus.publish({"type": "signals", "count": 1}))
+    await channel.subscribe()
+    while True:
+        await asyncio.sleep(3600)
+
+def start_realtime_bridge(url, key, bus=BUS, retry=10):
+    # Relays Supabase realtime INSERTs on `signals` into the local bus, for when
+    # the ingestion workers run in a different process from the dashboard.
+    def run():
+        while True:
+            try:
+                asyncio.run(_realtime_listen(url, key, bus))
+            except Exception as e:
+                print(f"Realtime bridge error: {e}. Reconnecting in {retry}s...")
+            time.sleep(retry)
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
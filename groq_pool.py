@@ -0,0 +1,124 @@
+import asyncio
+import os
+import re
+import threading
+import time
+import weakref
+from groq import AsyncGroq
+
+def parse_reset(value):
+    # Groq reports resets as "2m59.56s", "7.66s" or "250ms"
+    if value is None: return 0.0
+    try: return float(value)
+    except (TypeError, ValueError): pass
+    total = 0.0
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", str(value)):
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        now = time.monotonic()
+        self._refill(now)
+        self.level -= amount
+        wait = -self.level / self.rate if self.level < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def sync(self, limit, remaining, reset):
+        now = time.monotonic()
+        self._refill(now)
+        if limit:
+            self.capacity = float(limit)
+            self.rate = self.capacity / 60.0
+        if remaining is not None:
+            if limit: self.level = min(self.level, float(remaining))
+            if remaining <= 0 and reset:
+                self.blocked_until = max(self.blocked_until, now + reset)
+
+class RateLimiter:
+    # Request and token buckets shared by every loop using the same API key.
+    # They start from the configured quota and are corrected from the
+    # x-ratelimit-* headers of each response.
+    def __init__(self, rpm=30, tpm=12000):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = threading.Lock()
+
+    async def acquire(self, est_tokens):
+        with self._lock:
+            wait = max(self.requests.reserve(1), self.tokens.reserve(est_tokens))
+        if wait > 0: await asyncio.sleep(wait)
+
+    def update(self, headers):
+        def num(name):
+            try: return float(headers.get(name))
+            except (TypeError, ValueError): return None
+
+        with self._lock:
+            # the request headers describe a daily quota, so they only ever block;
+            # the token headers are per minute and also rescale the bucket
+            self.requests.sync(None, num("x-ratelimit-remaining-requests"),
+                               parse_reset(headers.get("x-ratelimit-reset-requests")))
+            self.tokens.sync(num("x-ratelimit-limit-tokens"), num("x-ratelimit-remaining-tokens"),
+                             parse_reset(headers.get("x-ratelimit-reset-tokens")))
+
+    def penalize(self, seconds):
+        with self._lock:
+            until = time.monotonic() + seconds
+            self.requests.blocked_until = max(self.requests.blocked_until, until)
+
+class GroqPool:
+    # One AsyncGroq client (and its httpx connection pool) per event loop: the
+    # HTML worker and the Telegram listener each run their own loop on their own
+    # thread, and httpx clients cannot be shared between loops.
+    def __init__(self, api_key, max_concurrency=None, rpm=None, tpm=None, max_retries=3):
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency or int(os.environ.get("GROQ_MAX_CONCURRENCY", 4))
+        self.limiter = RateLimiter(rpm or int(os.environ.get("GROQ_RPM", 30)),
+                                   tpm or int(os.environ.get("GROQ_TPM", 12000)))
+        self.max_retries = max_retries
+        self._loops = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _for_loop(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._loops.get(loop)
+            if entry is None:
+                entry = (AsyncGroq(api_key=self.api_key, max_retries=0), asyncio.Semaphore(self.max_concurrency))
+                self._loops[loop] = entry
+        return entry
+
+    async def complete(self, est_tokens=1000, **kwargs):
+        client, semaphore = self._for_loop()
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self.limiter.acquire(est_tokens)
+                try:
+                    raw = await client.chat.completions.with_raw_response.create(**kwargs)
+                except Exception as e:
+                    response = getattr(e, "response", None)
+                    if getattr(e, "status_code", None) != 429 or attempt == self.max_retries: raise
+                    headers = response.headers if response is not None else {}
+                    self.limiter.update(headers)
+                    self.limiter.penalize(parse_reset(headers.get("retry-after")) or 2 ** attempt)
+                    continue
+                self.limiter.update(raw.headers)
+                return raw.parse()
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._loops.pop(loop, None)
+        if entry: await entry[0].close()
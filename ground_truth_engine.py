@@ -1,6 +1,9 @@
-import requests
+import asyncio
+import aiohttp
 import os
+import time
 import streamlit as st
+import locations
 
 def get_secret(key):
     if key in os.environ:
@@ -13,21 +16,64 @@ def get_secret(key):
     return None
 
 WEATHERAPI_KEY = get_secret("WEATHERAPI_KEY")
+WEATHERAPI_URL = get_secret("WEATHERAPI_URL") or "http://api.weatherapi.com/v1/current.json"
+WEATHER_TTL = float(os.environ.get("WEATHER_TTL", 600))
+WEATHER_CONCURRENCY = int(os.environ.get("WEATHER_CONCURRENCY", 4))
+# one representative town per administrative district
+DEFAULT_DISTRICTS = [
+    "COLOMBO", "GAMPAHA", "KALUTARA", "KANDY", "MATALE", "NUWARA ELIYA", "GALLE", "MATARA", "HAMBANTOTA",
+    "JAFFNA", "KILINOCHCHI", "MANNAR", "VAVUNIYA", "MULLAITIVU", "BATTICALOA", "AMPARA", "TRINCOMALEE",
+    "KURUNEGALA", "PUTTALAM", "ANURADHAPURA", "POLONNARUWA", "BADULLA", "MONARAGALA", "RATNAPURA", "KEGALLE",
+]
+WEATHER_DISTRICTS = [d.strip().upper() for d in os.environ["WEATHER_DISTRICTS"].split(",")] if os.environ.get("WEATHER_DISTRICTS") else DEFAULT_DISTRICTS
+SEVERITY = {"CLEAR": 0, "MODERATE_RAIN": 1, "SEVERE_FLOOD": 2}
 
-def fetch_weather_risk(lat=6.927, lon=79.861):
-    if not WEATHERAPI_KEY:
-        return 0.0, "API_KEY_MISSING"
+def classify(rain_mm):
+    if rain_mm > 50: return rain_mm, "SEVERE_FLOOD"
+    elif rain_mm > 20: return rain_mm, "MODERATE_RAIN"
+    return rain_mm, "CLEAR"
 
-    try:
-        url = f"http://api.weatherapi.com/v1/current.json?key={WEATHERAPI_KEY}&q={lat},{lon}"
-        resp = requests.get(url, timeout=2)
-        if resp.status_code != 200: return 0.0, "API_ERROR"
-        
-        data = resp.json()
-        rain_mm = data.get('current', {}).get('precip_mm', 0.0)
-        
-        if rain_mm > 50: return rain_mm, "SEVERE_FLOOD"
-        elif rain_mm > 20: return rain_mm, "MODERATE_RAIN"
-        return rain_mm, "CLEAR"
-    except:
-        return 0.0, "ERROR"
+class WeatherClient:
+    # WeatherAPI readings for the ingestion loop. Runs on the caller's aiohttp
+    # session, fetches districts concurrently (at most `concurrency` requests
+    # in flight) and caches each district's reading for `ttl` seconds. Errors
+    # are not cached, so a failed district is retried on the next cycle.
+    def __init__(self, session, key=None, url=None, ttl=WEATHER_TTL, concurrency=WEATHER_CONCURRENCY, timeout=5):
+        self.session = session
+        self.key = key or WEATHERAPI_KEY
+        self.url = url or WEATHERAPI_URL
+        self.ttl = ttl
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.requests = 0
+        self._cache = {}
+        self._sem = asyncio.Semaphore(concurrency)
+
+    async def fetch(self, lat, lon):
+        if not self.key: return 0.0, "API_KEY_MISSING"
+        cache_key = (round(lat, 4), round(lon, 4))
+        hit = self._cache.get(cache_key)
+        if hit and hit[0] > time.monotonic(): return hit[1]
+
+        async with self._sem:
+            try:
+                self.requests += 1
+                async with self.session.get(self.url, params={"key": self.key, "q": f"{lat},{lon}"}, timeout=self.timeout) as resp:
+                    if resp.status != 200: return 0.0, "API_ERROR"
+                    data = await resp.json(content_type=None)
+                result = classify(float(data.get('current', {}).get('precip_mm', 0.0)))
+            except Exception:
+                return 0.0, "ERROR"
+        self._cache[cache_key] = (time.monotonic() + self.ttl, result)
+        return result
+
+    async def fetch_districts(self, districts=None):
+        names = [d for d in (districts or WEATHER_DISTRICTS) if d in locations.SRI_LANKA_GRID]
+        coords = [locations.SRI_LANKA_GRID[d] for d in names]
+        results = await asyncio.gather(*(self.fetch(c['lat'], c['lon']) for c in coords))
+        return dict(zip(names, results))
+
+def worst_status(readings):
+    # (district, rain_mm, status) of the most severe reading, wettest first
+    rated = [(name, rain, status) for name, (rain, status) in readings.items() if status in SEVERITY]
+    if not rated: return None, 0.0, "CLEAR"
+    return max(rated, key=lambda r: (SEVERITY[r[2]], r[1]))
@@ -0,0 +1,60 @@
+import re
+from lxml import etree, html
+
+DEFAULT_SELECTORS = [
+    'h4.posts-listunit-title a',
+    'h1 a',
+    'h3 a',
+    '.col-md-8 h3 a',
+    '.news-custom-heading a',
+    '.story-text a',
+    '.news-block a',
+    '.main-news-block a',
+    'h2 a'
+]
+
+SELECTOR_PROFILES = {
+    "default": DEFAULT_SELECTORS,
+}
+
+STEP_RE = re.compile(r"^([a-zA-Z][\w-]*)?((?:\.[\w-]+)*)$")
+
+def css_to_xpath(selector):
+    # only the subset our profiles use: "tag", ".class", "tag.class" and the
+    # descendant combinator
+    steps = []
+    for part in selector.split():
+        m = STEP_RE.match(part)
+        if not m: raise ValueError(f"Unsupported selector: {selector}")
+        tag, classes = m.group(1) or "*", m.group(2)
+        preds = "".join(
+            f"[contains(concat(' ', normalize-space(@class), ' '), ' {c} ')]"
+            for c in classes.split(".") if c
+        )
+        steps.append(tag + preds)
+    return "//" + "//".join(steps) + "[@href]"
+
+def compile_profile(selectors):
+    if isinstance(selectors, str): selectors = SELECTOR_PROFILES[selectors]
+    return [etree.XPath(css_to_xpath(s)) for s in selectors]
+
+def base_url(url):
+    parts = url.split('/')
+    return f"{parts[0]}//{parts[2]}" if len(parts) >= 3 else ""
+
+def extract_links(html_content, url, profile, per_selector=10):
+    # returns (title, href) pairs in profile order, de-duplicated on href
+    tree = html.fromstring(html_content)
+    root = base_url(url)
+    found = []
+    seen = set()
+    for xpath in profile:
+        for el in xpath(tree)[:per_selector]:
+            title = " ".join(el.text_content().split())
+            if not title: continue
+            href = el.get('href')
+            if href.startswith('/') and root: href = root + href
+            if href not in seen:
+                seen.add(href)
+                found.append((title, href))
+    return found
@@ -0,0 +1,105 @@
+import re
+from collections import defaultdict
+
+def trie_pattern(words):
+    # A plain "a|b|c" alternation makes re try every keyword at every offset;
+    # nesting shared prefixes lets it branch on one character at a time.
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w: node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        ends = "" in node
+        branches = [re.escape(ch) + build(sub) for ch, sub in sorted(node.items()) if ch]
+        if not branches: return ""
+        if len(branches) == 1 and not ends: return branches[0]
+        return "(?:" + "|".join(branches) + ")" + ("?" if ends else "")
+
+    return build(trie)
+
+class KeywordMatcher:
+    # All keyword lists compiled into one case-insensitive trie-shaped regex
+    # anchored at the start of a word. Keywords of the `prefix` categories
+    # match any word they begin ("rain" in "rainfall", "protest" in
+    # "protesters"); the rest match whole words plus a common ending
+    # (s, es, ed, ing, er, ers).
+    # A keyword that contains another keyword (e.g. "power station" / "station")
+    # inherits its categories at build time, so the non-overlapping regex scan
+    # still reports every category in one pass.
+    ENDINGS = "(?:es|s|ed|ing|ers|er)?"
+
+    def __init__(self, categories, prefix=()):
+        self.categories = {name: [k.lower() for k in words] for name, words in categories.items()}
+        owners = defaultdict(set)
+        for name, words in self.categories.items():
+            for w in words: owners[w].add(name)
+
+        prefix = set(prefix)
+        keywords = sorted(owners, key=len, reverse=True)
+        for k in keywords:
+            for other in keywords:
+                if other == k or len(other) >= len(k): continue
+                if re.search(rf"(?<!\w){re.escape(other)}(?!\w)", k):
+                    owners[k] |= owners[other]
+                elif re.search(rf"(?<!\w){re.escape(other)}", k):
+                    owners[k] |= owners[other] & prefix
+
+        # one scan: a whole-word keyword wins at a position, otherwise the
+        # longest prefix keyword takes the rest of the word
+        whole_words = [k for k in keywords if owners[k] - prefix]
+        prefix_words = [k for k in keywords if owners[k] & prefix]
+        self._whole = {k: frozenset(owners[k]) for k in whole_words}
+        self._prefix = {k: frozenset(owners[k] & prefix) for k in prefix_words}
+        branches = []
+        if whole_words: branches.append(rf"(?P<w>{trie_pattern(whole_words)}){self.ENDINGS}(?!\w)")
+        if prefix_words: branches.append(rf"(?P<p>{trie_pattern(prefix_words)})\w*")
+        self._pattern = re.compile(rf"(?<!\w)(?:{'|'.join(branches) or '(?!)'})", re.IGNORECASE)
+
+    def match(self, text):
+        hits = set()
+        for m in self._pattern.finditer(text or ""):
+            if m.group("w") is not None: hits |= self._whole[m.group("w").lower()]
+            else: hits |= self._prefix[m.group("p").lower()]
+        return hits
+
+    def matches(self, text, category):
+        return category in self.match(text)
+
+SPORTS_BAN_LIST = [
+    "cricket", "wicket", "t20", "odi", "ipl", "lpl", "rugby", "test match",
+    "won by", "lost by", "innings", "qualifier", "tournament",
+    "squad", "cup", "athlete", "championship", "final", "semi-final",
+    "selection", "captain"
+]
+
+CRITICAL_INFRASTRUCTURE = {
+    "PORT": ["colombo port", "harbour", "terminal", "customs", "container", "ship"],
+    "AIRPORT": ["bia", "katunayake", "mattala", "flights", "airline", "airport"],
+    "HIGHWAY": ["southern expressway", "kandy road", "galle road", "a1", "a4", "expressway", "highway", "interchange"],
+    "POWER": ["norochcholai", "sapugaskanda", "ceb", "grid", "breakdown", "substation", "power station", "blackout"],
+    "FINANCE": ["cse", "colombo stock exchange", "cbsl", "central bank", "forex", "rupee", "imf"]
+}
+
+LOW_SCORE_KEYWORDS = [
+    "traffic", "road", "lane", "highway", "expressway", "police", 
+    "check", "queue", "fuel", "gas", "petrol", "diesel", 
+    "strike", "protest", "accident", "crash", "delay", "clear", 
+    "normal", "blocked", "closed", "fallen", "tree", "electricity", "power",
+    "water", "train", "bus", "station", "weather", "rain"
+]
+
+SYMBOLIC_KEYWORDS = {
+    "FATALITY": ["dead", "killed"],
+    "INJURY": ["injured"],
+    "AID": ["donation", "grant"]
+}
+
+def build_matcher():
+    return KeywordMatcher({
+        "SPORTS": SPORTS_BAN_LIST,
+        "LOW_SCORE_RELEVANT": LOW_SCORE_KEYWORDS,
+        **SYMBOLIC_KEYWORDS,
+        **CRITICAL_INFRASTRUCTURE
+    }, prefix=["LOW_SCORE_RELEVANT", *SYMBOLIC_KEYWORDS])
@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid", "ref", "ref_src", "_ga", "t"}
+
+def canonical_url(url):
+    # scheme-less, lower-cased host without "www.", no fragment, no tracking
+    # parameters, remaining query sorted, no trailing slash
+    try:
+        parts = urlsplit(str(url).strip())
+    except ValueError:
+        return str(url).strip()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."): host = host[4:]
+    if parts.port and parts.port not in (80, 443): host = f"{host}:{parts.port}"
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")]
+    path = parts.path.rstrip("/") or "/"
+    canon = host + path
+    if query: canon += "?" + urlencode(sorted(query))
+    return canon
+
+class SeenLinks:
+    # Set-like, bounded replacement for the old SEEN_LINKS set: canonical URL ->
+    # last-seen time in insertion order, trimmed by count (LRU) and age. Exact,
+    # so no false positives. Optionally snapshotted to a JSON file.
+    def __init__(self, max_items=50000, max_age=14 * 86400, path=None, save_every=60):
+        self.max_items = max_items
+        self.max_age = max_age
+        self.path = path
+        self.save_every = save_every
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_save = time.time()
+        self.load()
+
+    def __contains__(self, url):
+        key = canonical_url(url)
+        with self._lock:
+            stamp = self._items.get(key)
+            if stamp is None: return False
+            if time.time() - stamp > self.max_age:
+                del self._items[key]
+                return False
+            return True
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, url, stamp=None):
+        key = canonical_url(url)
+        with self._lock:
+            self._items[key] = stamp or time.time()
+            self._items.move_to_end(key)
+            self._trim()
+        if self.path and time.time() - self._last_save > self.save_every:
+            self.save()
+
+    def discard(self, url):
+        with self._lock:
+            self._items.pop(canonical_url(url), None)
+
+    def _trim(self):
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        cutoff = time.time() - self.max_age
+        while self._items:
+            key, stamp = next(iter(self._items.items()))
+            if stamp >= cutoff: break
+            del self._items[key]
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path): return
+        try:
+            with open(self.path) as f:
+                rows = json.load(f)
+            with self._lock:
+                for key, stamp in rows:
+                    self._items[key] = stamp
+                self._trim()
+        except: pass
+
+    def save(self):
+        if not self.path: return
+        self._last_save = time.time()
+        with self._lock:
+            rows = list(self._items.items())
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(rows, f)
+            os.replace(tmp, self.path)
+        except: pass
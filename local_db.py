@@ -0,0 +1,117 @@
+import json
+import sqlite3
+import threading
+
+# Minimal SQLite stand-in for the slice of the supabase client API this project
+# uses: table().select/upsert/insert with eq/in_/gt/gte/order/limit/range, then execute().
+# Good enough for local runs, the benchmark harness and failure drills (set
+# `offline = True` to make every call raise).
+
+class Result:
+    def __init__(self, data):
+        self.data = data
+
+class Query:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.action = "select"
+        self.columns = None
+        self.rows = None
+        self.conflict = None
+        self.filters = []
+        self.orderings = []
+        self.offset = 0
+        self.max_rows = None
+
+    def select(self, columns="*"):
+        self.action = "select"
+        if columns.strip() != "*":
+            self.columns = [c.strip() for c in columns.split(",")]
+        return self
+
+    def upsert(self, rows, on_conflict=None):
+        self.action, self.rows, self.conflict = "upsert", rows, on_conflict
+        return self
+
+    def insert(self, rows):
+        self.action, self.rows = "insert", rows
+        return self
+
+    def eq(self, col, value):
+        self.filters.append((col, lambda v: v == value))
+        return self
+
+    def in_(self, col, values):
+        values = set(values)
+        self.filters.append((col, lambda v: v in values))
+        return self
+
+    def gt(self, col, value):
+        self.filters.append((col, lambda v: v is not None and v > value))
+        return self
+
+    def gte(self, col, value):
+        self.filters.append((col, lambda v: v is not None and v >= value))
+        return self
+
+    def order(self, col, desc=False):
+        self.orderings.append((col, desc))
+        return self
+
+    def limit(self, n):
+        self.max_rows = n
+        return self
+
+    def range(self, start, end):
+        # inclusive bounds, like PostgREST
+        self.offset, self.max_rows = start, end - start + 1
+        return self
+
+    def execute(self):
+        return self.client._execute(self)
+
+class LocalClient:
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self.offline = False
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS rows (tbl TEXT, id INTEGER PRIMARY KEY AUTOINCREMENT, k TEXT, data TEXT)")
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS rows_key ON rows (tbl, k)")
+
+    def table(self, name):
+        return Query(self, name)
+
+    def _execute(self, q):
+        with self._lock:
+            self.calls += 1
+            if self.offline: raise ConnectionError("local database offline")
+            if q.action == "select":
+                return Result(self._select(q))
+            rows = q.rows if isinstance(q.rows, list) else [q.rows]
+            for row in rows:
+                key = str(row.get(q.conflict)) if q.conflict else None
+                if key is not None:
+                    self._conn.execute("INSERT INTO rows (tbl, k, data) VALUES (?, ?, ?) "
+                                       "ON CONFLICT (tbl, k) DO UPDATE SET data = excluded.data",
+                                       (q.table, key, json.dumps(row)))
+                else:
+                    self._conn.execute("INSERT INTO rows (tbl, k, data) VALUES (?, NULL, ?)", (q.table, json.dumps(row)))
+            self._conn.commit()
+            return Result(rows)
+
+    def _select(self, q):
+        rows = [json.loads(d) for (d,) in self._conn.execute("SELECT data FROM rows WHERE tbl = ? ORDER BY id", (q.table,))]
+        for col, test in q.filters:
+            rows = [r for r in rows if test(r.get(col))]
+        # stable sorts, last key first, so chained order() calls break ties
+        for col, desc in reversed(q.orderings):
+            rows.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+        rows = rows[q.offset:]
+        if q.max_rows is not None:
+            rows = rows[:q.max_rows]
+        if q.columns:
+            rows = [{c: r.get(c) for c in q.columns} for r in rows]
+        return rows
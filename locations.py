@@ -1,3 +1,7 @@
+import math
+import re
+from functools import lru_cache
+
 SRI_LANKA_GRID = {
     "COLOMBO": {"lat": 6.9271, "lon": 79.8612},
     "FORT": {"lat": 6.9345, "lon": 79.8433},
@@ -160,32 +164,132 @@ LANDMARK_ALIASES = {
     "ARUGAMBAY": "ARUGAM BAY"
 }
 
-def get_coordinates(name):
-    if not name: return SRI_LANKA_GRID["COLOMBO"]
-    
-    clean_name = name.upper().strip()
-    
-    
-    if clean_name in LANDMARK_ALIASES:
-        target_city = LANDMARK_ALIASES[clean_name]
-        return SRI_LANKA_GRID[target_city]
-
-    
-    for alias, target in LANDMARK_ALIASES.items():
-        if alias in clean_name:
-            return SRI_LANKA_GRID[target]
-
-    
-    if clean_name in SRI_LANKA_GRID:
-        return SRI_LANKA_GRID[clean_name]
-    
-  
-    for key in SRI_LANKA_GRID:
-        if key in clean_name:
-            return SRI_LANKA_GRID[key]
-            
+# hyphens separate tokens, so "Kandy-bound" still contains KANDY and a
+# hyphenated name like JA-ELA is indexed as JA, ELA
+TOKEN_RE = re.compile(r"[A-Z0-9]+")
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.upper())
+
+def _build_place_index():
+    # token trie over every place and alias; a node's None key holds the
+    # (matched phrase, grid key) that ends there
+    root = {}
+    names = [(k, k) for k in SRI_LANKA_GRID] + list(LANDMARK_ALIASES.items())
+    for phrase, target in names:
+        node = root
+        for tok in tokenize(phrase):
+            node = node.setdefault(tok, {})
+        node[None] = (phrase, target)
+    return root
+
+PLACE_INDEX = _build_place_index()
+
+def find_locations(text):
+    if not text: return []
+    tokens = tokenize(text)
+    found = []
+    i = 0
+    while i < len(tokens):
+        node, best, end = PLACE_INDEX, None, i
+        for j in range(i, len(tokens)):
+            node = node.get(tokens[j])
+            if node is None: break
+            if None in node: best, end = node[None], j + 1
+        if best:
+            phrase, target = best
+            found.append({"name": target, "match": phrase, "tokens": end - i, "position": i,
+                          **SRI_LANKA_GRID[target]})
+            i = end
+        else:
+            i += 1
+    return found
+
+@lru_cache(maxsize=4096)
+def _best_location(text):
+    found = find_locations(text)
+    if found:
+        # most tokens, then longest phrase, then earliest mention
+        best = max(found, key=lambda f: (f["tokens"], len(f["match"]), -f["position"]))
+        return best["name"]
+
+    clean_name = text.upper().strip()
     for key in SRI_LANKA_GRID:
         if clean_name in key:
-            return SRI_LANKA_GRID[key]
-            
-    return SRI_LANKA_GRID["COLOMBO"]
+            return key
+    return "COLOMBO"
+
+def get_coordinates(name):
+    if not name: return SRI_LANKA_GRID["COLOMBO"]
+    return SRI_LANKA_GRID[_best_location(name)]
+
+def get_place(name):
+    key = _best_location(name) if name else "COLOMBO"
+    return {"name": key, **SRI_LANKA_GRID[key]}
+
+def get_all_coordinates(text):
+    seen = set()
+    results = []
+    for f in find_locations(text):
+        if f["name"] in seen: continue
+        seen.add(f["name"])
+        results.append({"name": f["name"], "lat": f["lat"], "lon": f["lon"]})
+    return results
+
+SRI_LANKA_BOUNDS = {"lat_min": 5.85, "lat_max": 9.90, "lon_min": 79.50, "lon_max": 81.95}
+GRID_CELL_DEG = 0.25
+
+def in_sri_lanka(lat, lon):
+    b = SRI_LANKA_BOUNDS
+    return b["lat_min"] <= lat <= b["lat_max"] and b["lon_min"] <= lon <= b["lon_max"]
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+def _cell(lat, lon):
+    return int(math.floor(lat / GRID_CELL_DEG)), int(math.floor(lon / GRID_CELL_DEG))
+
+def _build_spatial_index():
+    cells = {}
+    for name, c in SRI_LANKA_GRID.items():
+        cells.setdefault(_cell(c["lat"], c["lon"]), []).append(name)
+    return cells
+
+SPATIAL_INDEX = _build_spatial_index()
+
+def nearest_place(lat, lon, max_km=50.0):
+    # scan rings of grid cells outwards; a ring r cells away cannot hold
+    # anything closer than (r - 1) cell widths (~27 km per 0.25 deg)
+    ci, cj = _cell(lat, lon)
+    cell_km = GRID_CELL_DEG * 110.0 * math.cos(math.radians(min(abs(lat), 80)))
+    best, best_km = None, float("inf")
+    max_ring = int(max_km / cell_km) + 1
+    for r in range(max_ring + 1):
+        if best is not None and (r - 1) * cell_km > best_km: break
+        for i in range(ci - r, ci + r + 1):
+            for j in range(cj - r, cj + r + 1):
+                if max(abs(i - ci), abs(j - cj)) != r: continue
+                for name in SPATIAL_INDEX.get((i, j), ()):
+                    c = SRI_LANKA_GRID[name]
+                    d = haversine_km(lat, lon, c["lat"], c["lon"])
+                    if d < best_km: best, best_km = name, d
+    if best is None or best_km > max_km: return None, None
+    return best, best_km
+
+def snap_coordinates(lat, lon, snap_km=3.0, max_km=40.0):
+    # None when the point is outside Sri Lanka or nowhere near the gazetteer;
+    # otherwise the point (snapped onto the place when very close) and its name
+    try: lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError): return None
+    if not in_sri_lanka(lat, lon): return None
+    name, dist = nearest_place(lat, lon, max_km)
+    if name is None: return None
+    if dist <= snap_km:
+        return {"name": name, **SRI_LANKA_GRID[name]}
+    return {"name": name, "lat": lat, "lon": lon}
+
+def reverse_geocode(lat, lon, max_km=50.0):
+    return nearest_place(lat, lon, max_km)[0]
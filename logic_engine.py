@@ -1,9 +1,18 @@
+import asyncio
 import json
 import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
 import locations
 import streamlit as st
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from groq import AsyncGroq
+from groq_pool import GroqPool
+import keywords
+from preclassifier import PreClassifier
 
 def load_key_securely():
     key = None
@@ -17,127 +26,262 @@ def load_key_securely():
             pass
     return key
 
+# shared by the single-item and batch prompts, which differ only in the
+# JSON shape they ask for
+ANALYST_GUIDANCE = """
+You are a Strategic Analyst for Sri Lanka. Filter and Analyze.
+
+STEP 1: STRICT VALIDITY CHECK
+IS THIS "IMPORTANT DATA"?
+[TRUE] (Keep this):
+- ECONOMY: Loans, Grants, IMF, Taxes, Fuel Prices, Inflation.
+- INFRASTRUCTURE: Ports, Power, Water, Roads, Transport.
+- SECURITY: Crime, Protests, Strikes, Accidents, Disasters.
+- GOVERNANCE: New Laws, Curfews, Gazette Notifications.
+- LOGISTICS: "Traffic clear", "Train delayed", "Road closed".
+
+[FALSE] (TRASH this - Return validity=False):
+- POLITICAL GOSSIP: Party meetings, insults, speeches without policy, Rallies.
+- SPORTS: Cricket, Matches, Wins/Losses.
+- TRIVIA: Celebrity news, religious ceremonies, greetings, promotions.
+
+STEP 2: SENTIMENT ("RISK" or "OPPORTUNITY")
+- RISK: Danger, Delay, Loss, Strike, Violence, Bad Weather.
+- OPPORTUNITY: Investment, Donations (Grants), Foreign Aid, Tourism Spike, Development.
+
+STEP 3: SCORE (0-100)
+- 80-100: CRITICAL (Disaster, Deaths, Port Closure, Mega Projects).
+- 50-79:  HIGH (Floods, Protests, Highway Blocked, New Investments).
+- 25-49:  MEDIUM (Traffic delays, Routine Warnings).
+- 0-24:   LOW (Routine but valid updates like "Traffic normal").
+"""
+
+ANALYST_PROMPT = ANALYST_GUIDANCE + """
+Return JSON: {validity (bool), score (int), reason (str), sentiment_type, logistics_status, lat, lon}
+"""
+
+BATCH_PROMPT = ANALYST_GUIDANCE + """
+You will receive several numbered items. Judge each one independently.
+Return JSON: {"results": [{id (int), validity (bool), score (int), reason (str), sentiment_type, logistics_status, lat, lon}, ...]}
+with exactly one entry per item, using the item's number as id.
+"""
+
+LLM_MODEL = "llama-3.3-70b-versatile"
+LLM_BATCH_SIZE = int(os.environ.get("LLM_BATCH_SIZE", 8))
+# only LLM rejects are reported as "AI Filter"; data_engine samples those
+TRASH_REASONS = {"LOCAL_REJECT": "Local Filter", "Neural Offline": "Neural Offline"}
+
+def normalize_text(text):
+    text = re.sub(r"^\s*\[[^\]]*\]\s*", "", text or "")
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+class VerdictCache:
+    # LRU of parsed _neural_scan tuples keyed on the normalised text, with a
+    # TTL and an optional JSON snapshot so restarts keep recent verdicts. The
+    # context (the latest accepted headlines) is left out of the key: it moves
+    # with every accepted item, so a repost would almost never hit.
+    def __init__(self, max_items=5000, ttl=6 * 3600, path=None, save_every=30):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.path = path
+        self.save_every = save_every
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_save = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def key(self, text):
+        raw = normalize_text(text)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl:
+                if entry is not None: del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, verdict):
+        with self._lock:
+            self._items[key] = (time.time(), tuple(verdict))
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        if self.path and time.time() - self._last_save > self.save_every:
+            self.save()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path): return
+        try:
+            with open(self.path) as f:
+                rows = json.load(f)
+            now = time.time()
+            for key, stamp, verdict in rows[-self.max_items:]:
+                if now - stamp <= self.ttl:
+                    self._items[key] = (stamp, tuple(verdict))
+        except: pass
+
+    def save(self):
+        if not self.path: return
+        self._last_save = time.time()
+        with self._lock:
+            rows = [[k, ts, list(v)] for k, (ts, v) in self._items.items()]
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(rows, f)
+            os.replace(tmp, self.path)
+        except: pass
+
 class HybridBrain:
     def __init__(self):
         self.analyzer = SentimentIntensityAnalyzer()
         self.groq_key = load_key_securely()
+        self.verdict_cache = VerdictCache(path=os.environ.get("VERDICT_CACHE_PATH"))
+        self.llm = GroqPool(self.groq_key) if self.groq_key else None
         
-        self.SPORTS_BAN_LIST = [
-            "cricket", "wicket", "t20", "odi", "ipl", "lpl", "rugby", "match", 
-            "won by", "lost by", "innings", "runs", "qualifier", "tournament",
-            "squad", "cup", "athlete", "championship", "final", "semi-final",
-            "selection", "captain"
-        ]
-
-        self.CRITICAL_INFRASTRUCTURE = {
-            "PORT": ["colombo port", "harbour", "terminal", "customs", "container", "ship"],
-            "AIRPORT": ["bia", "katunayake", "mattala", "flights", "airline", "airport"],
-            "HIGHWAY": ["southern expressway", "kandy road", "galle road", "a1", "a4", "expressway", "highway", "interchange"],
-            "POWER": ["norochcholai", "sapugaskanda", "ceb", "grid", "breakdown", "substation", "power station", "blackout"],
-            "FINANCE": ["cse", "colombo stock exchange", "cbsl", "central bank", "forex", "rupee", "imf"]
-        }
+        self.SPORTS_BAN_LIST = keywords.SPORTS_BAN_LIST
+        self.CRITICAL_INFRASTRUCTURE = keywords.CRITICAL_INFRASTRUCTURE
+        self.keywords = keywords.build_matcher()
+        self.preclassifier = PreClassifier(
+            path=os.environ.get("PRECLASSIFIER_PATH", ".cache/preclassifier.npz"),
+            reject_confidence=float(os.environ.get("PRECLASSIFIER_REJECT", 0.9)),
+            accept_confidence=float(os.environ.get("PRECLASSIFIER_ACCEPT", 1.0)))
 
     async def _neural_scan(self, text, context=""):
         if not self.groq_key:
             return 0.0, "Neural Offline", "COLOMBO", "CLEAR", "RISK", 0.0, 0.0, False
 
+        cache_key = self.verdict_cache.key(text)
+        cached = self.verdict_cache.get(cache_key)
+        if cached is not None: return cached
+
+        verdict = await self._neural_scan_uncached(text, context)
+        if verdict[1] != "Neural Error":
+            self.verdict_cache.put(cache_key, verdict)
+        return verdict
+
+    def _parse_verdict(self, r):
+        if r.get('validity') is False:
+            return 0, "AI_REJECT", "", "", "", 0, 0, False
+
+        return (
+            r.get('score', 0), 
+            r.get('reason', 'AI Analysis'), 
+            r.get('location_name', ''), 
+            r.get('logistics_status', "CLEAR"), 
+            r.get('sentiment_type', r.get('sentiment_type', "RISK")),
+            r.get('lat', 0.0),
+            r.get('lon', 0.0),
+            True
+        )
+
+    async def _neural_scan_uncached(self, text, context=""):
         try:
-            async with AsyncGroq(api_key=self.groq_key) as client:
-                completion = await client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[
-                        {"role": "system", "content": """
-                        You are a Strategic Analyst for Sri Lanka. Filter and Analyze.
-
-                        STEP 1: STRICT VALIDITY CHECK
-                        IS THIS "IMPORTANT DATA"?
-                        [TRUE] (Keep this):
-                        - ECONOMY: Loans, Grants, IMF, Taxes, Fuel Prices, Inflation.
-                        - INFRASTRUCTURE: Ports, Power, Water, Roads, Transport.
-                        - SECURITY: Crime, Protests, Strikes, Accidents, Disasters.
-                        - GOVERNANCE: New Laws, Curfews, Gazette Notifications.
-                        - LOGISTICS: "Traffic clear", "Train delayed", "Road closed".
-
-                        [FALSE] (TRASH this - Return validity=False):
-                        - POLITICAL GOSSIP: Party meetings, insults, speeches without policy, Rallies.
-                        - SPORTS: Cricket, Matches, Wins/Losses.
-                        - TRIVIA: Celebrity news, religious ceremonies, greetings, promotions.
-
-                        STEP 2: SENTIMENT ("RISK" or "OPPORTUNITY")
-                        - RISK: Danger, Delay, Loss, Strike, Violence, Bad Weather.
-                        - OPPORTUNITY: Investment, Donations (Grants), Foreign Aid, Tourism Spike, Development.
-
-                        STEP 3: SCORE (0-100)
-                        - 80-100: CRITICAL (Disaster, Deaths, Port Closure, Mega Projects).
-                        - 50-79:  HIGH (Floods, Protests, Highway Blocked, New Investments).
-                        - 25-49:  MEDIUM (Traffic delays, Routine Warnings).
-                        - 0-24:   LOW (Routine but valid updates like "Traffic normal").
-
-                        Return JSON: {validity (bool), score (int), reason (str), sentiment_type, logistics_status, lat, lon}
-                        """},
-                        {"role": "user", "content": f"CONTEXT: {context}\n\nTEXT: {text}"}
-                    ],
-                    temperature=0, response_format={"type": "json_object"}
-                )
-                r = json.loads(completion.choices[0].message.content)
-            
-            if r.get('validity') is False:
-                return 0, "AI_REJECT", "", "", "", 0, 0, False
-
-            return (
-                r.get('score', 0), 
-                r.get('reason', 'AI Analysis'), 
-                r.get('location_name', ''), 
-                r.get('logistics_status', "CLEAR"), 
-                r.get('sentiment_type', r.get('sentiment_type', "RISK")),
-                r.get('lat', 0.0),
-                r.get('lon', 0.0),
-                True
+            completion = await self.llm.complete(
+                est_tokens=500 + (len(text) + len(context)) // 3,
+                model=LLM_MODEL,
+                messages=[
+                    {"role": "system", "content": ANALYST_PROMPT},
+                    {"role": "user", "content": f"CONTEXT: {context}\n\nTEXT: {text}"}
+                ],
+                temperature=0, response_format={"type": "json_object"}
             )
+            return self._parse_verdict(json.loads(completion.choices[0].message.content))
         except Exception as e:
             return 0.0, "Neural Error", "COLOMBO", "CLEAR", "RISK", 0.0, 0.0, True
 
-    def _fallback_symbolic_scan(self, text):
-        text_lower = text.lower()
+    async def _neural_scan_chunk(self, texts, context=""):
+        # one completion for the whole chunk; any item the model drops or
+        # mangles is re-asked on its own
+        verdicts = [None] * len(texts)
+        try:
+            items = "\n\n".join(f"[{i + 1}] {t}" for i, t in enumerate(texts))
+            completion = await self.llm.complete(
+                est_tokens=500 + len(texts) * 120 + (len(items) + len(context)) // 3,
+                model=LLM_MODEL,
+                messages=[
+                    {"role": "system", "content": BATCH_PROMPT},
+                    {"role": "user", "content": f"CONTEXT: {context}\n\nITEMS:\n{items}"}
+                ],
+                temperature=0, response_format={"type": "json_object"}
+            )
+            results = json.loads(completion.choices[0].message.content).get('results', [])
+            for r in results:
+                idx = int(r.get('id', 0)) - 1
+                if 0 <= idx < len(texts) and verdicts[idx] is None and 'validity' in r:
+                    verdicts[idx] = self._parse_verdict(r)
+        except Exception: pass
+
+        missing = [i for i, v in enumerate(verdicts) if v is None]
+        if missing:
+            retried = await asyncio.gather(*(self._neural_scan_uncached(texts[i], context) for i in missing))
+            for i, v in zip(missing, retried): verdicts[i] = v
+        return verdicts
+
+    async def _neural_scan_batch(self, texts, context=""):
+        if not self.groq_key:
+            return [(0.0, "Neural Offline", "COLOMBO", "CLEAR", "RISK", 0.0, 0.0, False) for _ in texts]
+
+        keys = [self.verdict_cache.key(t) for t in texts]
+        verdicts = [self.verdict_cache.get(k) for k in keys]
+        missing = [i for i, v in enumerate(verdicts) if v is None]
+        chunks = [missing[i:i + LLM_BATCH_SIZE] for i in range(0, len(missing), LLM_BATCH_SIZE)]
+
+        scanned = await asyncio.gather(*(self._neural_scan_chunk([texts[i] for i in c], context) for c in chunks))
+        for chunk, chunk_verdicts in zip(chunks, scanned):
+            for i, verdict in zip(chunk, chunk_verdicts):
+                verdicts[i] = verdict
+                if verdict[1] != "Neural Error":
+                    self.verdict_cache.put(keys[i], verdict)
+        return verdicts
+
+    def _fallback_symbolic_scan(self, text, hits=None):
+        if hits is None: hits = self.keywords.match(text)
         score = 0
         sentiment = "RISK"
 
-        if "dead" in text_lower or "killed" in text_lower: score += 75
-        if "injured" in text_lower: score += 40
-        if "donation" in text_lower or "grant" in text_lower: 
+        if "FATALITY" in hits: score += 75
+        if "INJURY" in hits: score += 40
+        if "AID" in hits: 
             score += 50
             sentiment = "OPPORTUNITY"
 
         return min(100, score), sentiment
 
-    async def analyze(self, text, context=""):
-        text_lower = text.lower()
-        
-        if any(ban_word in text_lower for ban_word in self.SPORTS_BAN_LIST):
+    def _prefilter(self, hits):
+        if "SPORTS" in hits:
             return {
                 "score": 0,
                 "priority": "TRASH",
                 "reason": "Hardcoded Sports Filter",
                 "vectors": {"lat": 0, "lon": 0, "logistics_impact": "None", "sentiment_type": "None"}
             }
-      
-        ai_score, ai_reason, _, logistics, sentiment_type, ai_lat, ai_lon, is_valid = await self._neural_scan(text, context)
+        return None
+
+    def _finalize(self, text, verdict, hits):
+        ai_score, ai_reason, _, logistics, sentiment_type, ai_lat, ai_lon, is_valid = verdict
 
         if not is_valid:
-             math_score, math_sentiment = self._fallback_symbolic_scan(text)
+             math_score, math_sentiment = self._fallback_symbolic_scan(text, hits)
              if math_score > 40:
                  is_valid = True
                  ai_score = math_score
                  ai_reason = "Symbolic Rescue"
                  sentiment_type = math_sentiment
              else:
-                 return {"priority": "TRASH", "reason": "AI Filter"}
+                 return {"priority": "TRASH", "reason": TRASH_REASONS.get(ai_reason, "AI Filter"), "verdict": verdict}
 
         if sentiment_type == "RISK":
-            infra_impacts = []
-            for sector, keywords in self.CRITICAL_INFRASTRUCTURE.items():
-                if any(k in text.lower() for k in keywords):
-                    infra_impacts.append(sector)
+            infra_impacts = [sector for sector in self.CRITICAL_INFRASTRUCTURE if sector in hits]
             
             if infra_impacts:
                 ai_reason += f" [IMPACT: {', '.join(infra_impacts)}]"
@@ -147,10 +291,11 @@ class HybridBrain:
         final_score = int(min(100, ai_score))
         if final_score < 15: final_score = 15
         
+        geo_data = None
         if isinstance(ai_lat, (int, float)) and ai_lat != 0.0:
-            geo_data = {"lat": ai_lat, "lon": ai_lon}
-        else:
-            geo_data = locations.get_coordinates(text)
+            geo_data = locations.snap_coordinates(ai_lat, ai_lon)
+        if geo_data is None:
+            geo_data = locations.get_place(text)
 
         priority = "CRITICAL" if final_score > 80 else "HIGH" if final_score > 40 else "MEDIUM"
         
@@ -160,10 +305,71 @@ class HybridBrain:
             "reason": ai_reason,
             "vectors": {
                 "lat": geo_data['lat'], "lon": geo_data['lon'],
+                "place": geo_data['name'],
                 "logistics_impact": logistics, 
                 "sentiment_type": sentiment_type
-            }
+            },
+            "verdict": verdict
         }
 
+    def apply_verdict(self, text, verdict):
+        # a story member reuses its representative's verdict (validity, score,
+        # logistics, sentiment) but gets its own location, keyword tags and
+        # symbolic rescue
+        score, reason, _, logistics, sentiment, _, _, is_valid = verdict
+        hits = self.keywords.match(text)
+        rejected = self._prefilter(hits)
+        if rejected: return rejected
+        result = self._finalize(text, (score, reason, "", logistics, sentiment, 0.0, 0.0, is_valid), hits)
+        if result.get("priority") != "TRASH": result["reason"] += " [STORY]"
+        return result
+
+    def _local_verdicts(self, texts, hits, embeddings):
+        # verdicts the embedding classifier is confident about, None elsewhere.
+        # Local rejects still get the symbolic rescue in _finalize.
+        verdicts = [None] * len(texts)
+        if embeddings is None or not self.preclassifier.ready: return verdicts
+        idx = [i for i, v in enumerate(embeddings) if v is not None]
+        if not idx: return verdicts
+        decisions = self.preclassifier.decide(np.stack([embeddings[i] for i in idx]))
+        for i, d in zip(idx, decisions):
+            if d < 0:
+                verdicts[i] = (0, "LOCAL_REJECT", "", "", "", 0, 0, False)
+                self.preclassifier.decided["reject"] += 1
+            elif d > 0:
+                score, sentiment = self._fallback_symbolic_scan(texts[i], hits[i])
+                verdicts[i] = (score, "Local Classifier", "", "CLEAR", sentiment, 0.0, 0.0, True)
+                self.preclassifier.decided["accept"] += 1
+            else:
+                self.preclassifier.decided["llm"] += 1
+        return verdicts
+
+    async def analyze(self, text, context="", embedding=None):
+        hits = self.keywords.match(text)
+        rejected = self._prefilter(hits)
+        if rejected: return rejected
+        verdict = self._local_verdicts([text], [hits], [embedding])[0]
+        if verdict is None: verdict = await self._neural_scan(text, context)
+        return self._finalize(text, verdict, hits)
+
+    async def analyze_batch(self, texts, context="", embeddings=None):
+        hits = [self.keywords.match(t) for t in texts]
+        results = [self._prefilter(h) for h in hits]
+        if embeddings is not None:
+            embeddings = [v if r is None else None for v, r in zip(embeddings, results)]
+        local = self._local_verdicts(texts, hits, embeddings)
+        for i, verdict in enumerate(local):
+            if results[i] is None and verdict is not None:
+                results[i] = self._finalize(texts[i], verdict, hits[i])
+        pending = [i for i, r in enumerate(results) if r is None]
+        verdicts = await self._neural_scan_batch([texts[i] for i in pending], context)
+        for i, verdict in zip(pending, verdicts):
+            results[i] = self._finalize(texts[i], verdict, hits[i])
+        return results
+
+    def is_low_score_relevant(self, text):
+        return self.keywords.matches(text, "LOW_SCORE_RELEVANT")
+
 brain = HybridBrain()
-async def calculate_risk(text, context=""): return await brain.analyze(text, context)
+async def calculate_risk(text, context="", embedding=None): return await brain.analyze(text, context, embedding)
+async def calculate_risk_batch(texts, context="", embeddings=None): return await brain.analyze_batch(texts, context, embeddings)
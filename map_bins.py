@@ -0,0 +1,143 @@
+import json
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+
+LAT0, LON0 = 7.87, 80.77
+KM_PER_DEG_LAT = 110.57
+KM_PER_DEG_LON = 111.32 * math.cos(math.radians(LAT0))
+HOUR = 3600
+DAY = 86400
+
+def to_hex(lat, lon, size_km):
+    # pointy-top axial hex coordinates on a local equirectangular projection
+    x = (np.asarray(lon, dtype=float) - LON0) * KM_PER_DEG_LON
+    y = (np.asarray(lat, dtype=float) - LAT0) * KM_PER_DEG_LAT
+    q = (math.sqrt(3) / 3 * x - y / 3) / size_km
+    r = (2 / 3 * y) / size_km
+    # cube rounding
+    cx, cz = q, r
+    cy = -cx - cz
+    rx, ry, rz = np.round(cx), np.round(cy), np.round(cz)
+    dx, dy, dz = np.abs(rx - cx), np.abs(ry - cy), np.abs(rz - cz)
+    fix_x = (dx > dy) & (dx > dz)
+    fix_z = ~fix_x & (dz >= dy)
+    rx = np.where(fix_x, -ry - rz, rx)
+    rz = np.where(fix_z, -rx - ry, rz)
+    return rx.astype(int), rz.astype(int)
+
+def hex_center(q, r, size_km):
+    x = size_km * math.sqrt(3) * (np.asarray(q) + np.asarray(r) / 2)
+    y = size_km * 1.5 * np.asarray(r)
+    return LAT0 + y / KM_PER_DEG_LAT, LON0 + x / KM_PER_DEG_LON
+
+def _vector_fields(raw):
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else raw
+        return float(data.get('lat', 6.927)), float(data.get('lon', 79.861)), str(data.get('sentiment_type', 'RISK'))
+    except:
+        return 6.927, 79.861, "RISK"
+
+class HexBins:
+    # Country-wide hex aggregation of every signal in the last `retention`
+    # days. Bins are kept per UTC hour, so any window up to the retention is a
+    # sum over its hour slices, and new rows only touch the bins they fall in.
+    # Only the columns needed for binning are ever fetched.
+    def __init__(self, db, size_km=5.0, retention_days=30, min_refresh=5.0, page_size=1000,
+                 overlap=timedelta(minutes=5)):
+        self.db = db
+        self.size_km = size_km
+        self.retention_days = retention_days
+        self.min_refresh = min_refresh
+        self.page_size = page_size
+        self.overlap = overlap
+        self.queries = 0
+        self._bins = pd.DataFrame(columns=["hour", "q", "r", "count", "risk_weight", "opp_weight", "risk_max"])
+        self._links = {}
+        self._latest = None
+        self._refreshed = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, rows):
+        rows = [r for r in rows if r.get('link') not in self._links]
+        if not rows: return 0
+        fields = [_vector_fields(r.get('vectors')) for r in rows]
+        lat, lon, sentiment = (np.array(c) for c in zip(*fields))
+        stamps = pd.to_datetime([r['timestamp'] for r in rows], utc=True, format='ISO8601')
+        epoch = stamps.as_unit('s').asi8
+        score = np.array([float(r.get('risk_score') or 0) for r in rows])
+        is_opp = sentiment == 'OPPORTUNITY'
+        q, r_ = to_hex(lat, lon, self.size_km)
+
+        new = pd.DataFrame({
+            "hour": epoch - epoch % HOUR, "q": q, "r": r_, "count": 1,
+            "risk_weight": np.where(is_opp, 0.0, score), "opp_weight": np.where(is_opp, score, 0.0),
+            "risk_max": np.where(is_opp, 0.0, score),
+        })
+        merged = pd.concat([self._bins, new], ignore_index=True) if len(self._bins) else new
+        self._bins = merged.groupby(["hour", "q", "r"], as_index=False).agg(
+            {"count": "sum", "risk_weight": "sum", "opp_weight": "sum", "risk_max": "max"})
+        for row, ts in zip(rows, epoch):
+            self._links[row.get('link')] = ts
+        newest = stamps.max().to_pydatetime()
+        self._latest = newest if self._latest is None else max(self._latest, newest)
+        return len(rows)
+
+    def _trim(self):
+        cutoff = time.time() - self.retention_days * DAY
+        self._bins = self._bins[self._bins["hour"] >= cutoff - HOUR]
+        self._links = {k: ts for k, ts in self._links.items() if ts >= cutoff}
+
+    def _fetch(self, since, skip=0):
+        self.queries += 1
+        res = (self.db.table('signals').select("link, timestamp, vectors, risk_score")
+               .gte('timestamp', since).order('timestamp').order('link')
+               .range(skip, skip + self.page_size - 1).execute())
+        return res.data or []
+
+    def refresh(self):
+        if self.db is None: return
+        with self._lock:
+            if time.monotonic() - self._refreshed < self.min_refresh: return
+            try:
+                since = (self._latest - self.overlap if self._latest
+                         else datetime.now(timezone.utc) - timedelta(days=self.retention_days)).isoformat()
+                skip = 0
+                while True:
+                    # keyset paging on timestamp, skipping the rows already
+                    # read at the boundary timestamp; add() drops repeats
+                    rows = self._fetch(since, skip)
+                    self.add(rows)
+                    if len(rows) < self.page_size: break
+                    last = rows[-1]['timestamp']
+                    tied = sum(1 for r in rows if r['timestamp'] == last)
+                    skip = skip + tied if last == since else tied
+                    since = last
+                self._trim()
+            except Exception:
+                pass
+            self._refreshed = time.monotonic()
+
+    def frame(self, window=timedelta(days=7)):
+        # one row per hex for the window: centre, weights and an RGBA colour
+        # running from red (all risk) to cyan (all opportunity)
+        self.refresh()
+        with self._lock:
+            cutoff = time.time() - window.total_seconds()
+            # whole hours only, so a window never reaches past its cutoff
+            bins = self._bins[self._bins["hour"] >= cutoff]
+            if bins.empty: return pd.DataFrame()
+            out = bins.groupby(["q", "r"], as_index=False).agg(
+                {"count": "sum", "risk_weight": "sum", "opp_weight": "sum", "risk_max": "max"})
+        out = out.rename(columns={"r": "hex_r"})
+        out["lat"], out["lon"] = hex_center(out["q"], out["hex_r"], self.size_km)
+        total = out["risk_weight"] + out["opp_weight"]
+        balance = np.where(total > 0, out["opp_weight"] / total.where(total > 0, 1), 0.0)
+        out["weight"] = total
+        out["r"] = (255 * (1 - balance)).astype(int)
+        out["g"] = out["b"] = (255 * balance).astype(int)
+        out["a"] = 180
+        return out
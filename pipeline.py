@@ -0,0 +1,113 @@
+import asyncio
+import time
+from collections import deque
+
+class Stage:
+    def __init__(self, name, fn, workers=1, batch_size=1, max_wait=0.0, queue_size=256,
+                 retries=0, retry_delay=1.0, on_error=None):
+        # fn takes a list of items and returns (or awaits) a list of outputs
+        # for the next stage. A batch whose fn raises is retried `retries`
+        # times (backing off from retry_delay), then handed to on_error.
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.queue_size = queue_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.on_error = on_error
+        self.processed = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=10000)
+
+class Pipeline:
+    # Chain of stages joined by bounded asyncio queues. A full queue blocks the
+    # stage (or submitter) feeding it, so a slow LLM or database stage throttles
+    # intake instead of piling up unbounded gathers.
+    def __init__(self, stages):
+        self.stages = stages
+        self.queues = [asyncio.Queue(maxsize=s.queue_size) for s in stages]
+        self._workers = []
+
+    def start(self):
+        if self._workers: return
+        for i, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                self._workers.append(asyncio.create_task(self._run(i)))
+
+    async def submit(self, items):
+        for item in items:
+            await self.queues[0].put(item)
+
+    async def _next_batch(self, queue, stage):
+        batch = [await queue.get()]
+        deadline = time.monotonic() + stage.max_wait
+        while len(batch) < stage.batch_size:
+            try:
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0: break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _call(self, stage, batch):
+        for attempt in range(stage.retries + 1):
+            try:
+                results = stage.fn(batch)
+                if asyncio.iscoroutine(results) or isinstance(results, asyncio.Future):
+                    results = await results
+                return results
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == stage.retries: raise
+                print(f"Pipeline stage {stage.name} failed on {len(batch)} items, retrying: {e!r}")
+                await asyncio.sleep(stage.retry_delay * 2 ** attempt)
+
+    async def _run(self, index):
+        stage = self.stages[index]
+        queue = self.queues[index]
+        out = self.queues[index + 1] if index + 1 < len(self.queues) else None
+        while True:
+            batch = await self._next_batch(queue, stage)
+            started = time.perf_counter()
+            try:
+                results = await self._call(stage, batch)
+                stage.processed += len(batch)
+                stage.latencies.append(time.perf_counter() - started)
+                if out is not None:
+                    for r in results or []:
+                        await out.put(r)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stage.errors += 1
+                print(f"Pipeline stage {stage.name} failed on {len(batch)} items: {e!r}")
+                if stage.on_error:
+                    try: stage.on_error(batch)
+                    except Exception: pass
+            finally:
+                for _ in batch: queue.task_done()
+
+    async def drain(self):
+        # queues are joined front to back, so everything submitted before the
+        # call has cleared every stage when this returns
+        for queue in self.queues:
+            await queue.join()
+
+    async def stop(self, drain=True):
+        if drain: await self.drain()
+        for w in self._workers: w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self):
+        return {s.name: {"processed": s.processed, "errors": s.errors, "queued": q.qsize()}
+                for s, q in zip(self.stages, self.queues)}
@@ -0,0 +1,81 @@
+import os
+import numpy as np
+
+# accepted rows whose verdict did not come from the LLM: the symbolic rescue
+# overrode an LLM reject, local accepts are the classifier's own output and
+# story members reuse a verdict given for another text
+NON_LLM_REASONS = ("Symbolic Rescue", "Local Classifier", "[STORY]")
+
+class PreClassifier:
+    # Logistic head over the normalised MiniLM embeddings the dedupe step
+    # already computes, trained on rows the LLM accepted (signals) against a
+    # sample of rows it rejected (signal_rejects). decide() only answers when
+    # P(valid) clears a confidence threshold; everything else still goes to
+    # the LLM. accept_confidence=1.0 disables local accepts, since a local
+    # accept has no LLM score or location and falls back to the symbolic scan.
+    def __init__(self, path=None, reject_confidence=0.9, accept_confidence=1.0, min_samples=200):
+        self.path = path
+        self.reject_confidence = reject_confidence
+        self.accept_confidence = accept_confidence
+        self.min_samples = min_samples
+        self.coef = None
+        self.intercept = 0.0
+        self.samples = 0
+        self.decided = {"reject": 0, "accept": 0, "llm": 0}
+        self.load()
+
+    @property
+    def ready(self):
+        return self.coef is not None and self.samples >= self.min_samples
+
+    def fit(self, vectors, labels, C=1.0):
+        from sklearn.linear_model import LogisticRegression
+        model = LogisticRegression(C=C, class_weight="balanced", max_iter=1000)
+        model.fit(np.asarray(vectors, dtype=np.float32), np.asarray(labels, dtype=int))
+        self.coef = model.coef_[0].astype(np.float32)
+        self.intercept = float(model.intercept_[0])
+        self.samples = len(labels)
+        return self
+
+    def predict_proba(self, vectors):
+        # P(valid) per row
+        z = np.asarray(vectors, dtype=np.float32) @ self.coef + self.intercept
+        return 1.0 / (1.0 + np.exp(-z))
+
+    def decide(self, vectors, reject_confidence=None, accept_confidence=None):
+        # -1 confidently trash, 1 confidently valid, 0 ask the LLM
+        reject = self.reject_confidence if reject_confidence is None else reject_confidence
+        accept = self.accept_confidence if accept_confidence is None else accept_confidence
+        p = self.predict_proba(vectors)
+        return np.select([p <= 1 - reject, p > accept], [-1, 1], default=0)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path): return
+        try:
+            data = np.load(self.path)
+            self.coef = data["coef"]
+            self.intercept = float(data["intercept"])
+            self.samples = int(data["samples"])
+        except: pass
+
+    def save(self):
+        if not self.path or self.coef is None: return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp.npz"
+        np.savez(tmp, coef=self.coef, intercept=self.intercept, samples=self.samples)
+        os.replace(tmp, self.path)
+
+def load_training_rows(db, limit=5000):
+    # (text, label, timestamp) from LLM verdicts: accepted signals are 1, the
+    # sampled AI rejects are 0. Rows accepted without an LLM verdict of their
+    # own are left out rather than labelled valid.
+    rows = []
+    res = db.table('signals').select("full_text, headline, reason, timestamp").order('timestamp', desc=True).limit(limit).execute()
+    for r in res.data or []:
+        if any(tag in str(r.get('reason')) for tag in NON_LLM_REASONS): continue
+        rows.append((r.get('full_text') or r.get('headline') or "", 1, r.get('timestamp')))
+    res = db.table('signal_rejects').select("full_text, headline, timestamp").order('timestamp', desc=True).limit(limit).execute()
+    for r in res.data or []:
+        rows.append((r.get('full_text') or r.get('headline') or "", 0, r.get('timestamp')))
+    rows = [r for r in rows if r[0]]
+    return sorted(rows, key=lambda r: str(r[2]))
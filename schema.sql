@@ -0,0 +1,27 @@
+-- Rolling aggregates maintained by data_engine (bucket_aggregates.BucketAggregator).
+create table if not exists signal_buckets (
+    bucket_key   text primary key,
+    resolution   text not null,
+    bucket_start timestamptz not null,
+    count        integer not null default 0,
+    risk_count   integer not null default 0,
+    risk_sum     integer not null default 0,
+    risk_max     integer not null default 0,
+    opp_count    integer not null default 0,
+    opp_sum      integer not null default 0,
+    opp_max      integer not null default 0,
+    trend_sum    integer not null default 0
+);
+
+create index if not exists signal_buckets_resolution_start on signal_buckets (resolution, bucket_start);
+
+-- Sampled LLM rejects (data_engine.REJECT_WRITER), negatives for preclassifier.PreClassifier.
+create table if not exists signal_rejects (
+    link      text primary key,
+    timestamp timestamptz not null,
+    source    text,
+    headline  text,
+    full_text text
+);
+
+create index if not exists signal_rejects_timestamp on signal_rejects (timestamp);
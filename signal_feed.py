@@ -0,0 +1,167 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+from bucket_aggregates import RESOLUTIONS, chart_series, fetch_buckets
+
+VECTOR_DEFAULTS = (6.927, 79.861, "CLEAR", "RISK")
+
+def _parse_vector(raw):
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else raw
+        return (float(data.get('lat', 6.927)), float(data.get('lon', 79.861)),
+                str(data.get('logistics_impact', 'CLEAR')), str(data.get('sentiment_type', 'RISK')))
+    except:
+        return VECTOR_DEFAULTS
+
+def prepare_signals(df):
+    # Adds the dashboard's derived columns with column operations. The JSON
+    # `vectors` column is the only per-row work and is parsed once, when the
+    # row first enters the feed.
+    if df.empty: return df
+    df = df.copy()
+    parsed = [_parse_vector(v) for v in df['vectors']]
+    lat, lon, logistics, sentiment = zip(*parsed)
+    df['lat'] = np.array(lat, dtype=float)
+    df['lon'] = np.array(lon, dtype=float)
+    df['logistics'] = list(logistics)
+    df['sentiment'] = list(sentiment)
+
+    df['timestamp_utc'] = pd.to_datetime(df['timestamp'], utc=True, format='ISO8601')
+    df['timestamp'] = df['timestamp_utc'].dt.tz_convert('Asia/Colombo').dt.tz_localize(None)
+
+    score = pd.to_numeric(df['risk_score'], errors='coerce').fillna(0)
+    is_opp = (df['sentiment'] == 'OPPORTUNITY').to_numpy()
+    df['Trend Value'] = np.where(is_opp, score, -score)
+
+    # map colour as separate channels; the deck layer reads "[r, g, b, a]"
+    palette = np.array([[0, 255, 255, 200], [255, 0, 0, 180], [255, 165, 0, 180], [0, 255, 100, 180]])
+    idx = np.select([is_opp, score > 75, score > 40], [0, 1, 2], default=3)
+    df[['r', 'g', 'b', 'a']] = palette[idx]
+    return df
+
+class SignalFeed:
+    # Process-wide view of the signals table shared by every dashboard session.
+    # The first call pages in the history window; afterwards only rows newer than
+    # the newest timestamp seen are fetched (with an overlap, because the
+    # ingestion pipeline can commit a row a little after its timestamp) and the
+    # frame is trimmed back to the window. Sessions refreshing within
+    # `min_refresh` seconds of each other share one query. `version` moves
+    # whenever a refresh brings in rows the frame did not have yet.
+    def __init__(self, db, history=timedelta(days=7), max_rows=50000, overlap=timedelta(minutes=5),
+                 min_refresh=1.0, page_size=1000, key="link"):
+        self.db = db
+        self.history = history
+        self.max_rows = max_rows
+        self.overlap = overlap
+        self.min_refresh = min_refresh
+        self.page_size = page_size
+        self.key = key
+        self.queries = 0
+        self.version = 0
+        self._frame = pd.DataFrame()
+        self._latest = None
+        self._refreshed = 0.0
+        self._lock = threading.Lock()
+
+    def frame(self):
+        with self._lock:
+            if time.monotonic() - self._refreshed >= self.min_refresh:
+                try:
+                    self._refresh()
+                except Exception:
+                    pass
+                self._refreshed = time.monotonic()
+            return self._frame
+
+    def _fetch(self, since, skip):
+        self.queries += 1
+        res = (self.db.table('signals').select("*").gte('timestamp', since).order('timestamp').order(self.key)
+               .range(skip, skip + self.page_size - 1).execute())
+        return res.data or []
+
+    def _read_since(self, since):
+        # keyset paging on timestamp, skipping the rows already read at the
+        # boundary timestamp, so no page is cut short by the row cap
+        rows, skip = [], 0
+        while True:
+            page = self._fetch(since, skip)
+            rows.extend(page)
+            if len(page) < self.page_size: return rows
+            last = page[-1]['timestamp']
+            tied = sum(1 for r in page if r['timestamp'] == last)
+            skip = skip + tied if last == since else tied
+            since = last
+
+    def _refresh(self):
+        if self.db is None: return
+        now = datetime.now(timezone.utc)
+        since = self._latest - self.overlap if self._latest is not None else now - self.history
+        rows = self._read_since(since.isoformat())
+        if not rows: return
+        # the overlap re-reads rows the frame already has; _latest still moves
+        # on, so a busy overlap window cannot pin the feed in place
+        newest = pd.to_datetime([r['timestamp'] for r in rows], utc=True, format='ISO8601').max().to_pydatetime()
+        self._latest = newest if self._latest is None else max(self._latest, newest)
+
+        if not self._frame.empty:
+            known = set(self._frame[self.key])
+            rows = [r for r in rows if r.get(self.key) not in known]
+        if not rows: return
+        new = prepare_signals(pd.DataFrame(rows))
+
+        frame = new if self._frame.empty else pd.concat([self._frame, new], ignore_index=True)
+        frame = frame.drop_duplicates(subset=self.key, keep='last')
+        frame = frame[frame['timestamp_utc'] >= now - self.history].sort_values('timestamp_utc', kind='stable')
+        self._frame = frame.tail(self.max_rows).reset_index(drop=True)
+        self.version += 1
+
+def _bucket_frame(rows):
+    df = pd.DataFrame(rows)
+    if df.empty: return df
+    out = pd.DataFrame({
+        "timestamp": pd.to_datetime(df['bucket_start'], utc=True, format='ISO8601').dt.tz_convert('Asia/Colombo').dt.tz_localize(None),
+        "Opportunity": df['opp_max'].astype(float),
+        "Risk": -df['risk_max'].astype(float),
+        "count": df['count'].astype(int),
+    })
+    return out.sort_values('timestamp').reset_index(drop=True)
+
+def buckets_from_frame(df, freq='5min'):
+    # fallback when signal_buckets is empty (e.g. not migrated yet)
+    if df.empty: return pd.DataFrame()
+    score = df['risk_score'].astype(float)
+    is_opp = df['sentiment'] == 'OPPORTUNITY'
+    frame = pd.DataFrame({"timestamp": df['timestamp'], "Opportunity": score.where(is_opp),
+                          "Risk": -score.where(~is_opp), "count": 1})
+    grouped = frame.set_index('timestamp').resample(freq)
+    out = pd.DataFrame({"Opportunity": grouped['Opportunity'].max(), "Risk": grouped['Risk'].min(),
+                        "count": grouped['count'].sum()})
+    out = out[out['count'] > 0].fillna(0)
+    return out.reset_index()
+
+class BucketSeries:
+    # Fixed-size volatility series read from the signal_buckets aggregates
+    # that the ingestion writer maintains; shared across sessions like SignalFeed.
+    def __init__(self, db, min_refresh=5.0):
+        self.db = db
+        self.min_refresh = min_refresh
+        self._frame = pd.DataFrame()
+        self._refreshed = 0.0
+        self._lock = threading.Lock()
+
+    def frame(self):
+        with self._lock:
+            if self.db is not None and time.monotonic() - self._refreshed >= self.min_refresh:
+                try:
+                    now = time.time()
+                    rows = []
+                    for res, (width, keep) in RESOLUTIONS.items():
+                        rows.extend(fetch_buckets(self.db, res, now - width * keep))
+                    self._frame = _bucket_frame(chart_series(rows, now))
+                except Exception:
+                    pass
+                self._refreshed = time.monotonic()
+            return self._frame
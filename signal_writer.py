@@ -0,0 +1,148 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class SignalWriter:
+    # Write-behind buffer for the signals table. add() only buffers; the
+    # background thread upserts in batches once `batch_size` are waiting or
+    # every `flush_interval` seconds, retried
+    # with exponential backoff, and spooled to a local SQLite file if the
+    # database stays unreachable. The spool is replayed on every flush tick, so
+    # rows already paid for in LLM calls are not lost to a Supabase outage.
+    # Rows are delivered in order: new rows wait behind anything still spooled,
+    # since an upsert of an older row would overwrite a newer one.
+    def __init__(self, get_db, table="signals", on_conflict="link", batch_size=100,
+                 flush_interval=2.0, max_retries=3, backoff=0.5, spool_path=".cache/spool.sqlite"):
+        self.get_db = get_db
+        self.table = table
+        self.on_conflict = on_conflict
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.spool_path = spool_path
+        self.written = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.listeners = []
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._spool = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def _spool_conn(self):
+        if self._spool is None:
+            os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+            self._spool = sqlite3.connect(self.spool_path, check_same_thread=False)
+            self._spool.execute("CREATE TABLE IF NOT EXISTS spool (id INTEGER PRIMARY KEY AUTOINCREMENT, tbl TEXT, row TEXT)")
+            self._spool.commit()
+        return self._spool
+
+    def start(self):
+        if self._thread: return
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread: self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set(): break
+            self.flush()
+
+    def add(self, rows):
+        # never writes on the caller's thread (often an event loop): a full
+        # buffer just wakes the flush thread early
+        with self._lock:
+            self._buffer.extend(rows)
+            full = len(self._buffer) >= self.batch_size
+        if full: self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def _upsert(self, rows):
+        db = self.get_db()
+        if db is None: raise ConnectionError("no database")
+        db.table(self.table).upsert(rows, on_conflict=self.on_conflict).execute()
+
+    def _write(self, rows):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._upsert(rows)
+                return True
+            except Exception:
+                if attempt < self.max_retries:
+                    time.sleep(self.backoff * 2 ** attempt)
+        return False
+
+    def _notify(self, rows):
+        for listener in self.listeners:
+            try: listener(rows)
+            except Exception: pass
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            self._replay()
+            backlog = self._spool_count() > 0
+            for i in range(0, len(rows), self.batch_size):
+                chunk = rows[i:i + self.batch_size]
+                if not backlog and self._write(chunk):
+                    self.written += len(chunk)
+                    self._notify(chunk)
+                else:
+                    self._spool_rows(chunk)
+                    backlog = True
+
+    def _spool_rows(self, rows):
+        conn = self._spool_conn()
+        conn.executemany("INSERT INTO spool (tbl, row) VALUES (?, ?)", [(self.table, json.dumps(r)) for r in rows])
+        conn.commit()
+        self.spooled += len(rows)
+
+    def _spool_count(self):
+        if self._spool is None and not os.path.exists(self.spool_path): return 0
+        return self._spool_conn().execute("SELECT COUNT(*) FROM spool WHERE tbl = ?", (self.table,)).fetchone()[0]
+
+    def spool_size(self):
+        with self._flush_lock:
+            return self._spool_count()
+
+    def _replay(self):
+        if self._spool is None and not os.path.exists(self.spool_path): return 0
+        conn = self._spool_conn()
+        replayed = 0
+        while True:
+            batch = conn.execute("SELECT id, row FROM spool WHERE tbl = ? ORDER BY id LIMIT ?",
+                                 (self.table, self.batch_size)).fetchall()
+            if not batch: break
+            rows = [json.loads(r) for _, r in batch]
+            try:
+                self._upsert(rows)
+            except Exception:
+                break
+            conn.execute(f"DELETE FROM spool WHERE id IN ({','.join('?' * len(batch))})", [i for i, _ in batch])
+            conn.commit()
+            replayed += len(rows)
+            self._notify(rows)
+        self.replayed += replayed
+        return replayed
+
+    def replay(self):
+        with self._flush_lock:
+            return self._replay()
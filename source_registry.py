@@ -0,0 +1,58 @@
+import json
+import os
+import random
+import time
+import html_extract
+
+SOURCES_PATH = os.environ.get("SOURCES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sources.json"))
+
+DEFAULTS = {"type": "html", "profile": "default", "interval": 60, "min_interval": 20, "max_interval": 600, "enabled": True}
+
+def load_sources(path=None):
+    with open(path or SOURCES_PATH) as f:
+        entries = json.load(f)
+    sources = []
+    for entry in entries:
+        source = {**DEFAULTS, **entry}
+        if not source["enabled"]: continue
+        # profiles may be a registered name or an inline selector list
+        source["profile"] = html_extract.compile_profile(source["profile"])
+        sources.append(source)
+    return sources
+
+class SourceSchedule:
+    # Per-source polling timer: stretches while a source yields nothing new,
+    # snaps back towards min_interval when it starts producing, and backs off
+    # exponentially on fetch failures. Every delay gets +/-jitter.
+    def __init__(self, source, jitter=0.1, grow=1.5, shrink=0.5, max_failure_backoff=1800):
+        self.source = source
+        self.interval = float(source["interval"])
+        self.min_interval = float(source["min_interval"])
+        self.max_interval = float(source["max_interval"])
+        self.jitter = jitter
+        self.grow = grow
+        self.shrink = shrink
+        self.max_failure_backoff = max_failure_backoff
+        self.failures = 0
+        self.last_poll = None
+        self.last_new = 0
+
+    def record(self, new_items, failed=False):
+        self.last_poll = time.time()
+        if failed:
+            self.failures += 1
+            return
+        self.failures = 0
+        self.last_new = new_items
+        if new_items:
+            self.interval = max(self.min_interval, self.interval * self.shrink)
+        else:
+            self.interval = min(self.max_interval, self.interval * self.grow)
+
+    def next_delay(self, cap=None):
+        if self.failures:
+            delay = min(self.max_failure_backoff, self.interval * 2 ** self.failures)
+        else:
+            delay = self.interval
+        if cap: delay = min(delay, cap)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
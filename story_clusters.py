@@ -0,0 +1,106 @@
+import threading
+import time
+import numpy as np
+from vector_index import normalize
+
+class StoryClusters:
+    # Streaming single-pass clustering of the embedding stream into stories.
+    # Each item joins the story whose running-mean centroid it is closest to
+    # (above `threshold`) or starts a new one. A story keeps the verdict of its
+    # last LLM score; it only needs a new one when it has none yet or its size
+    # has grown by `jump_factor` (and at least `min_jump` reports) since then.
+    # Stories idle for max_age are dropped; when full, the stalest is recycled.
+    def __init__(self, threshold=0.6, max_age=72 * 3600, capacity=5000, jump_factor=2.0, min_jump=3):
+        self.threshold = threshold
+        self.max_age = max_age
+        self.capacity = capacity
+        self.jump_factor = jump_factor
+        self.min_jump = min_jump
+        self._centroids = None
+        self._stories = [None] * capacity
+        self._slots = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _free_slot(self):
+        for i, story in enumerate(self._stories):
+            if story is None: return i
+        i = min(range(self.capacity), key=lambda k: self._stories[k]["last_seen"])
+        self._drop(i)
+        return i
+
+    def _drop(self, i):
+        del self._slots[self._stories[i]["id"]]
+        self._stories[i] = None
+        self._centroids[i] = 0.0
+
+    def evict(self, now=None):
+        cutoff = (now or time.time()) - self.max_age
+        with self._lock:
+            stale = [i for i, s in enumerate(self._stories) if s is not None and s["last_seen"] < cutoff]
+            for i in stale: self._drop(i)
+        return len(stale)
+
+    def assign(self, vecs, stamps=None):
+        # one snapshot per input: {id, size, first_seen, last_seen}
+        if not len(vecs): return []
+        vecs = normalize(vecs)
+        now = time.time()
+        if stamps is None: stamps = [now] * len(vecs)
+        self.evict(now)
+
+        out = []
+        with self._lock:
+            if self._centroids is None:
+                self._centroids = np.zeros((self.capacity, vecs.shape[1]), dtype=np.float32)
+            for vec, ts in zip(vecs, stamps):
+                sims = self._centroids @ vec
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    story = self._stories[best]
+                    self._centroids[best] = normalize(self._centroids[best] * story["size"] + vec)[0]
+                    story["size"] += 1
+                    story["first_seen"] = min(story["first_seen"], ts)
+                    story["last_seen"] = max(story["last_seen"], ts)
+                else:
+                    best = self._free_slot()
+                    story = {"id": self._next_id, "size": 1, "first_seen": ts, "last_seen": ts,
+                             "scored_size": 0, "verdict": None}
+                    self._next_id += 1
+                    self._centroids[best] = vec
+                    self._stories[best] = story
+                    self._slots[story["id"]] = best
+                out.append({k: story[k] for k in ("id", "size", "first_seen", "last_seen")})
+        return out
+
+    def _get(self, story_id):
+        slot = self._slots.get(story_id)
+        return None if slot is None else self._stories[slot]
+
+    def jumped(self, story_id):
+        with self._lock:
+            story = self._get(story_id)
+            if story is None or story["verdict"] is None: return False
+            grown = story["size"] - story["scored_size"]
+            return story["size"] >= story["scored_size"] * self.jump_factor and grown >= self.min_jump
+
+    def needs_score(self, story_id):
+        with self._lock:
+            story = self._get(story_id)
+            if story is None or story["verdict"] is None: return True
+        return self.jumped(story_id)
+
+    def verdict(self, story_id):
+        with self._lock:
+            story = self._get(story_id)
+            return None if story is None else story["verdict"]
+
+    def mark_scored(self, story_id, verdict):
+        with self._lock:
+            story = self._get(story_id)
+            if story is None: return
+            story["verdict"] = verdict
+            story["scored_size"] = story["size"]
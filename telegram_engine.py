@@ -22,6 +22,47 @@ API_HASH = "5e8435321c3c529ea50fa8ed3f9b2526"
 
 client = None
 
+COALESCE_WINDOW = float(os.environ.get("TELEGRAM_COALESCE_WINDOW", 2.0))
+COALESCE_MAX = int(os.environ.get("TELEGRAM_COALESCE_MAX", 25))
+
+CHAT_NAMES = {}
+
+class SignalCoalescer:
+    # Holds messages for up to `window` seconds after the first one arrives
+    # (or until `max_size` are waiting) and hands them on as one batch.
+    def __init__(self, sink, window=COALESCE_WINDOW, max_size=COALESCE_MAX):
+        self.sink = sink
+        self.window = window
+        self.max_size = max_size
+        self._buffer = []
+        self._timer = None
+
+    async def add(self, signal):
+        self._buffer.append(signal)
+        if len(self._buffer) >= self.max_size:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.window, lambda: asyncio.ensure_future(self.flush()))
+
+    async def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._buffer = self._buffer, []
+        if batch:
+            try:
+                await self.sink(batch)
+            except Exception as e:
+                print(f"Telegram Flush Error: {e}")
+
+async def chat_name(event):
+    name = CHAT_NAMES.get(event.chat_id)
+    if name is None:
+        chat = await event.get_chat()
+        name = CHAT_NAMES[event.chat_id] = getattr(chat, 'title', getattr(chat, 'username', 'Unknown'))
+    return name
+
 async def start_telegram_listener():
     global client
     
@@ -32,6 +73,7 @@ async def start_telegram_listener():
         return
 
     print("Telegram Listener Service Starting...")
+    coalescer = SignalCoalescer(data_engine.submit)
 
     while True:
         try:
@@ -50,8 +92,7 @@ async def start_telegram_listener():
 
                     print(f"Telegram Signal Received: {text[:30]}...")
 
-                    chat = await event.get_chat()
-                    source_name = getattr(chat, 'title', getattr(chat, 'username', 'Unknown'))
+                    source_name = await chat_name(event)
 
                     signal = {
                         "title": text[:100] + "...",
@@ -61,7 +102,7 @@ async def start_telegram_listener():
                         "published": datetime.now(timezone.utc).isoformat()
                     }
                     
-                    await data_engine.beam_to_cloud([signal], "CLEAR")
+                    await coalescer.add(signal)
 
                 except Exception as e:
                     print(f"Telegram Handler Error: {e}")
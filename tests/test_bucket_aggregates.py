@@ -0,0 +1,34 @@
+import time
+import local_db
+from bucket_aggregates import BucketAggregator, fetch_bucket_keys, fetch_buckets, open_buckets
+
+def seeded_db(now):
+    db = local_db.LocalClient()
+    agg = BucketAggregator()
+    rows = [{"timestamp": now - i * 60, "risk_score": 50, "vectors": {"sentiment_type": "RISK"}} for i in range(3000)]
+    db.table('signal_buckets').upsert(agg.add(rows), on_conflict="bucket_key").execute()
+    return db
+
+def test_fetch_buckets_pages_past_the_row_cap():
+    now = time.time()
+    db = seeded_db(now)
+    rows = fetch_buckets(db, "1m", now - 360 * 60, page_size=100)
+    assert len(rows) == len({r["bucket_key"] for r in rows}) >= 360
+    assert [r["bucket_start"] for r in rows] == sorted(r["bucket_start"] for r in rows)
+    assert {r["resolution"] for r in rows} == {"1m"}
+
+def test_open_buckets_are_current_and_previous():
+    now = time.time()
+    rows = open_buckets(seeded_db(now), now)
+    by_res = {}
+    for r in rows: by_res.setdefault(r["resolution"], []).append(r)
+    assert {res: len(v) for res, v in by_res.items()} == {"1m": 2, "5m": 2, "1h": 2}
+
+def test_add_resumes_buckets_that_are_not_in_memory():
+    now = time.time()
+    db = seeded_db(now)
+    persisted = {r["bucket_key"]: r["count"] for r in fetch_buckets(db, "1h", now - 6 * 3600)}
+    agg = BucketAggregator(load_missing=lambda keys: fetch_bucket_keys(db, keys))
+    rows = agg.add([{"timestamp": now - 2 * 3600, "risk_score": 10, "vectors": {"sentiment_type": "RISK"}}])
+    hour = next(r for r in rows if r["resolution"] == "1h")
+    assert hour["count"] == persisted[hour["bucket_key"]] + 1
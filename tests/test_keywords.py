@@ -0,0 +1,16 @@
+import keywords
+
+MATCHER = keywords.build_matcher()
+
+def test_inflected_low_score_keywords_still_hit():
+    for text in ("Lorry crashed into wall", "Protesters block entrance", "Heavy rainfall expected"):
+        assert MATCHER.matches(text, "LOW_SCORE_RELEVANT"), text
+
+def test_sports_needs_whole_words():
+    assert not MATCHER.matches("Bus runs late", "SPORTS")
+    assert not MATCHER.matches("Cupboard sale", "SPORTS")
+    assert MATCHER.matches("Sri Lanka won by 5 wickets", "SPORTS")
+
+def test_contained_keywords_keep_every_category():
+    assert MATCHER.match("Power station blackout") >= {"POWER", "LOW_SCORE_RELEVANT"}
+    assert MATCHER.match("Highways jammed") == {"HIGHWAY", "LOW_SCORE_RELEVANT"}
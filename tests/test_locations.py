@@ -0,0 +1,9 @@
+import locations
+
+def test_hyphenated_text_still_matches_places():
+    assert locations.get_place("Kandy-bound train delayed")["name"] == "KANDY"
+    assert [f["name"] for f in locations.find_locations("Colombo-Kandy road closed")] == ["COLOMBO", "KANDY"]
+
+def test_hyphenated_place_names_match_with_or_without_the_hyphen():
+    assert locations.get_place("Flooding in Ja-Ela town")["name"] == "JA-ELA"
+    assert locations.get_place("Ja Ela junction blocked")["name"] == "JA-ELA"
@@ -0,0 +1,28 @@
+import time
+from datetime import datetime, timedelta, timezone
+import local_db
+from map_bins import HexBins
+
+def iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+def signal(link, ts):
+    return {"link": link, "timestamp": iso(ts), "risk_score": 50, "vectors": {"lat": 7.0, "lon": 80.0}}
+
+def test_refresh_pages_through_rows_sharing_a_timestamp():
+    db = local_db.LocalClient()
+    stamp = time.time() - 600
+    db.table('signals').upsert([signal(f"a{i}", stamp) for i in range(2500)] + [signal("late", stamp + 60)],
+                               on_conflict="link").execute()
+    bins = HexBins(db, page_size=1000)
+    bins.refresh()
+    assert int(bins.frame(timedelta(days=1))["count"].sum()) == 2501
+
+def test_window_stops_at_its_cutoff():
+    db = local_db.LocalClient()
+    now = time.time()
+    db.table('signals').upsert([signal("recent", now - 3 * 3600), signal("old", now - 30 * 3600)],
+                               on_conflict="link").execute()
+    bins = HexBins(db)
+    assert int(bins.frame(timedelta(days=1))["count"].sum()) == 1
+    assert int(bins.frame(timedelta(days=2))["count"].sum()) == 2
@@ -0,0 +1,42 @@
+import asyncio
+import pipeline
+
+def test_failed_batch_is_counted_and_handed_to_on_error():
+    failed, done = [], []
+
+    def work(batch):
+        if "bad" in batch: raise ValueError("boom")
+        done.extend(batch)
+        return []
+
+    async def run():
+        p = pipeline.Pipeline([pipeline.Stage("work", work, on_error=failed.extend)])
+        p.start()
+        await p.submit(["bad"])
+        await p.drain()
+        await p.submit(["good"])
+        await p.stop()
+        return p.stats()
+
+    stats = asyncio.run(run())
+    assert failed == ["bad"] and done == ["good"]
+    assert stats["work"]["errors"] == 1
+
+def test_transient_failure_is_retried_before_on_error():
+    failed, calls = [], []
+
+    def work(batch):
+        calls.append(list(batch))
+        if len(calls) == 1: raise ConnectionError("flaky")
+        return []
+
+    async def run():
+        p = pipeline.Pipeline([pipeline.Stage("work", work, retries=1, retry_delay=0, on_error=failed.extend)])
+        p.start()
+        await p.submit(["item"])
+        await p.stop()
+        return p.stats()
+
+    stats = asyncio.run(run())
+    assert calls == [["item"], ["item"]] and failed == []
+    assert stats["work"]["errors"] == 0 and stats["work"]["processed"] == 1
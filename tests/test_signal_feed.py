@@ -0,0 +1,26 @@
+import time
+from datetime import datetime, timezone
+import local_db
+from signal_feed import SignalFeed
+
+def signal(link, ts):
+    return {"link": link, "timestamp": datetime.fromtimestamp(ts, timezone.utc).isoformat(), "risk_score": 40,
+            "headline": link, "vectors": {"lat": 7.0, "lon": 80.0, "sentiment_type": "RISK"}}
+
+def test_first_load_pages_past_the_row_cap():
+    db = local_db.LocalClient()
+    now = time.time()
+    db.table('signals').upsert([signal(f"s{i}", now - i * 60) for i in range(2500)], on_conflict="link").execute()
+    feed = SignalFeed(db, page_size=1000, min_refresh=0)
+    assert len(feed.frame()) == 2500
+
+def test_busy_overlap_window_does_not_stall_the_feed():
+    db = local_db.LocalClient()
+    now = time.time()
+    db.table('signals').upsert([signal(f"s{i}", now - 120 + i * 0.1) for i in range(1200)], on_conflict="link").execute()
+    feed = SignalFeed(db, page_size=1000, min_refresh=0)
+    feed.frame()
+    version = feed.version
+    db.table('signals').upsert([signal("fresh", time.time())], on_conflict="link").execute()
+    assert "fresh" in set(feed.frame()["link"])
+    assert feed.version == version + 1
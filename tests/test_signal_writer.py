@@ -0,0 +1,77 @@
+import time
+import local_db
+from signal_writer import SignalWriter
+
+def rows(n, start=0):
+    return [{"link": f"https://example.lk/{i}", "headline": f"Signal {i}"} for i in range(start, start + n)]
+
+def stored(db):
+    return {r["link"] for r in db.table("signals").select("link").execute().data}
+
+def make_writer(db, tmp_path, **kwargs):
+    kwargs.setdefault("backoff", 0.2)
+    return SignalWriter(lambda: db, spool_path=str(tmp_path / "spool.sqlite"), **kwargs)
+
+def test_add_only_buffers(tmp_path):
+    db = local_db.LocalClient()
+    writer = make_writer(db, tmp_path, batch_size=10)
+    writer.add(rows(25))
+    assert writer.pending() == 25
+    assert db.calls == 0
+
+    writer.flush()
+    assert writer.pending() == 0
+    assert writer.written == 25
+    assert len(stored(db)) == 25
+
+def test_full_buffer_does_not_block_when_offline(tmp_path):
+    db = local_db.LocalClient()
+    db.offline = True
+    writer = make_writer(db, tmp_path, batch_size=10, max_retries=3)
+    started = time.monotonic()
+    writer.add(rows(10))
+    # a synchronous write would sit in the retry backoff (0.2 + 0.4 + 0.8s)
+    assert time.monotonic() - started < 0.1
+    assert db.calls == 0
+
+def test_spool_and_replay(tmp_path):
+    db = local_db.LocalClient()
+    writer = make_writer(db, tmp_path, batch_size=10, max_retries=0)
+    db.offline = True
+    writer.add(rows(15))
+    writer.flush()
+    assert writer.spooled == 15 and writer.spool_size() == 15
+
+    db.offline = False
+    assert writer.replay() == 15
+    assert writer.spool_size() == 0
+    assert len(stored(db)) == 15
+
+def test_background_thread_flushes_full_buffer(tmp_path):
+    db = local_db.LocalClient()
+    writer = make_writer(db, tmp_path, batch_size=10, flush_interval=30)
+    notified = []
+    writer.listeners.append(notified.extend)
+    writer.start()
+    try:
+        writer.add(rows(10))
+        deadline = time.monotonic() + 5
+        while writer.written < 10 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.written == 10
+        assert len(notified) == 10
+    finally:
+        writer.stop()
+
+def test_spooled_rows_land_before_newer_ones(tmp_path):
+    db = local_db.LocalClient()
+    writer = SignalWriter(lambda: db, table="signal_buckets", on_conflict="bucket_key",
+                          spool_path=str(tmp_path / "spool.sqlite"), max_retries=0)
+    db.offline = True
+    writer.add([{"bucket_key": "1m:0", "count": 1}])
+    writer.flush()
+    db.offline = False
+    writer.add([{"bucket_key": "1m:0", "count": 2}])
+    writer.flush()
+    assert writer.spool_size() == 0
+    assert db.table("signal_buckets").select("*").execute().data == [{"bucket_key": "1m:0", "count": 2}]
@@ -0,0 +1,10 @@
+import time
+from vector_index import VectorIndex
+
+def test_query_ignores_rows_past_max_age():
+    index = VectorIndex(capacity=8, max_age=60)
+    index.insert(["old"], [[1.0, 0.0]], stamps=[time.time() - 30])
+    assert index.query([[1.0, 0.0]])[0] > 0.99
+    index.max_age = 10
+    assert index.query([[1.0, 0.0]])[0] == 0.0
+    assert len(index) == 0
@@ -0,0 +1,77 @@
+import asyncio
+import aiohttp
+from aiohttp import web
+import ground_truth_engine
+from ground_truth_engine import WeatherClient
+
+async def stub_server(handler):
+    app = web.Application()
+    app.router.add_get("/current.json", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/current.json"
+
+def run_against(handler, check):
+    async def main():
+        runner, url = await stub_server(handler)
+        try:
+            async with aiohttp.ClientSession() as session:
+                return await check(session, url)
+        finally:
+            await runner.cleanup()
+    return asyncio.run(main())
+
+def test_readings_are_cached_for_the_ttl():
+    async def handler(request):
+        return web.json_response({"current": {"precip_mm": 30.0}})
+
+    async def check(session, url):
+        client = WeatherClient(session, key="k", url=url, ttl=60)
+        first = await client.fetch(6.9, 79.8)
+        second = await client.fetch(6.9, 79.8)
+        expired = WeatherClient(session, key="k", url=url, ttl=0)
+        await expired.fetch(6.9, 79.8)
+        await expired.fetch(6.9, 79.8)
+        return first, second, client.requests, expired.requests
+
+    assert run_against(handler, check) == ((30.0, "MODERATE_RAIN"), (30.0, "MODERATE_RAIN"), 1, 2)
+
+def test_requests_in_flight_stay_under_the_limit():
+    state = {"now": 0, "peak": 0}
+
+    async def handler(request):
+        state["now"] += 1
+        state["peak"] = max(state["peak"], state["now"])
+        await asyncio.sleep(0.02)
+        state["now"] -= 1
+        return web.json_response({"current": {"precip_mm": 0.0}})
+
+    async def check(session, url):
+        client = WeatherClient(session, key="k", url=url, concurrency=3)
+        return await client.fetch_districts(ground_truth_engine.DEFAULT_DISTRICTS)
+
+    readings = run_against(handler, check)
+    assert len(readings) == len(ground_truth_engine.DEFAULT_DISTRICTS)
+    assert set(readings.values()) == {(0.0, "CLEAR")}
+    assert 1 < state["peak"] <= 3
+
+def test_errors_are_reported_and_not_cached(monkeypatch):
+    monkeypatch.setattr(ground_truth_engine, "WEATHERAPI_KEY", None)
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        if len(calls) == 1: return web.Response(status=500)
+        if len(calls) == 2: return web.Response(text="not json")
+        return web.json_response({"current": {"precip_mm": 80.0}})
+
+    async def check(session, url):
+        client = WeatherClient(session, key="k", url=url)
+        missing = await WeatherClient(session, key="", url=url).fetch(6.9, 79.8)
+        return missing, [await client.fetch(6.9, 79.8) for _ in range(3)]
+
+    missing, results = run_against(handler, check)
+    assert missing == (0.0, "API_KEY_MISSING")
+    assert results == [(0.0, "API_ERROR"), (0.0, "ERROR"), (80.0, "SEVERE_FLOOD")]
@@ -0,0 +1,80 @@
+import threading
+import time
+import numpy as np
+
+def normalize(vecs):
+    vecs = np.atleast_2d(np.asarray(vecs, dtype=np.float32))
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vecs / norms
+
+class VectorIndex:
+    # Fixed-size ring buffer of L2-normalised embeddings. Slots are overwritten
+    # oldest-first once full, and anything older than max_age is zeroed out so
+    # it can never score above a dedupe threshold again.
+    def __init__(self, capacity=20000, max_age=72 * 3600, dim=None):
+        self.capacity = capacity
+        self.max_age = max_age
+        self.dim = None
+        self._lock = threading.Lock()
+        self._head = 0
+        self._size = 0
+        self._used = 0
+        if dim: self._allocate(dim)
+
+    def _allocate(self, dim):
+        self.dim = dim
+        self._vecs = np.zeros((self.capacity, dim), dtype=np.float32)
+        self._stamps = np.zeros(self.capacity, dtype=np.float64)
+        self._texts = [None] * self.capacity
+
+    def __len__(self):
+        return self._size
+
+    def query(self, vecs):
+        # expire first: after a quiet spell nothing has been inserted to do it
+        self.evict()
+        vecs = normalize(vecs)
+        with self._lock:
+            if not self._size:
+                return np.zeros(len(vecs), dtype=np.float32)
+            scores = self._vecs[:self._used] @ vecs.T
+        return scores.max(axis=0)
+
+    def insert(self, texts, vecs, stamps=None):
+        if not len(vecs): return
+        vecs = normalize(vecs)
+        now = time.time()
+        if stamps is None: stamps = [now] * len(vecs)
+
+        with self._lock:
+            if self.dim is None: self._allocate(vecs.shape[1])
+            for text, vec, ts in zip(texts, vecs, stamps):
+                i = self._head
+                self._vecs[i] = vec
+                self._stamps[i] = ts
+                self._texts[i] = text
+                self._head = (i + 1) % self.capacity
+                self._size = min(self._size + 1, self.capacity)
+                self._used = max(self._used, i + 1)
+        self.evict()
+
+    def evict(self, now=None):
+        if self.dim is None: return 0
+        cutoff = (now or time.time()) - self.max_age
+        evicted = 0
+        with self._lock:
+            while self._size:
+                tail = (self._head - self._size) % self.capacity
+                if self._stamps[tail] >= cutoff: break
+                self._vecs[tail] = 0.0
+                self._texts[tail] = None
+                self._size -= 1
+                evicted += 1
+        return evicted
+
+    def recent_texts(self, n):
+        with self._lock:
+            n = min(n, self._size)
+            idx = [(self._head - k) % self.capacity for k in range(n, 0, -1)]
+            return [self._texts[i] for i in idx]